@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import os
+import getopt
+import timeit
+import string
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "wordbase"))
+
+import cmdparser
+import match
+
+script_name = os.path.basename(__file__)
+
+default_corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands.txt")
+
+
+def usage():
+    print("Usage: {} [-n repeat] parser [corpus_file]".format(script_name), file=sys.stderr)
+    print("       {} [-n repeat] preprocess word_file".format(script_name), file=sys.stderr)
+    print("Benchmarks wordbase components.", file=sys.stderr)
+    print("The parser benchmark compares the grammar, the fast path and the cache on a corpus of command lines, one per line.", file=sys.stderr)
+    print("The preprocess benchmark compares the former headword preprocessing with the current normalizer on a list of words, one per line.", file=sys.stderr)
+
+def read_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip('\n') for line in f]
+
+def report(name, elapsed, count):
+    print("{:<16} {:8.3f} s {:10.2f} us/item".format(name, elapsed, elapsed * 1e6 / count))
+
+def bench_parser(repeat, args):
+    if len(args) > 1:
+        usage()
+        sys.exit(2)
+    lines = read_corpus(args[0] if args else default_corpus)
+
+    cmdparser.init(0)
+
+    for line in lines:
+        if cmdparser.parse_command(line) != cmdparser.parse_command(line, False):
+            print("results differ for command line: {!r}".format(line), file=sys.stderr)
+            sys.exit(1)
+
+    print("{} command lines".format(len(lines)))
+
+    for name, fast_path in (("grammar", False), ("fast path", True)):
+        elapsed = timeit.timeit(lambda: [cmdparser.parse_command(line, fast_path) for line in lines], number=repeat)
+        report(name, elapsed, len(lines) * repeat)
+
+    cmdparser.init(len(lines))
+    elapsed = timeit.timeit(lambda: [cmdparser.parse_command(line) for line in lines], number=repeat)
+    report("cached", elapsed, len(lines) * repeat)
+
+_no_punctuation = {ord(c): None for c in string.punctuation}
+
+def legacy_preprocess(word):
+    return ' '.join(word.translate(_no_punctuation).split()).lower()
+
+def bench_preprocess(repeat, args):
+    if len(args) != 1:
+        usage()
+        sys.exit(2)
+    words = read_corpus(args[0])
+
+    differences = sum(1 for word in words if legacy_preprocess(word) != match.normalize(word))
+    print("{} words, {} normalized differently".format(len(words), differences))
+
+    for name, func in (("legacy", lambda: [legacy_preprocess(word) for word in words]),
+                       ("normalize", lambda: [match.normalize(word) for word in words]),
+                       ("normalize all", lambda: match.normalize_all(words))):
+        elapsed = timeit.timeit(func, number=repeat)
+        report(name, elapsed, len(words) * repeat)
+
+
+benchmarks = {
+              "parser": bench_parser,
+              "preprocess": bench_preprocess,
+             }
+
+try:
+    opts, args = getopt.getopt(sys.argv[1:], "n:")
+except getopt.GetoptError:
+    usage()
+    sys.exit(2)
+
+repeat = 100
+for opt, arg in opts:
+    if opt == "-n":
+        repeat = int(arg)
+
+if not args or args[0] not in benchmarks:
+    usage()
+    sys.exit(2)
+
+benchmarks[args[0]](repeat, args[1:])
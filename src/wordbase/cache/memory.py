@@ -0,0 +1,137 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import time
+import collections
+import logging
+
+import modules
+import cache
+import util.stats
+
+
+logger = None
+
+_max_size = 0
+_ttl = 0
+
+_lock = None
+_entries = collections.OrderedDict()
+_size = 0
+
+_counters = util.stats.Counters("hits", "misses", "evictions")
+
+
+def _stats():
+    return _counters.items() + [("entries", len(_entries)), ("size", _size)]
+
+def init(max_size, ttl):
+    """initializes the cache with a size budget in bytes and a TTL in seconds; used also by other cache modules, which keep data in memory"""
+
+    global _max_size, _ttl
+    _max_size = max_size
+    _ttl = ttl
+
+    global _lock
+    _lock = modules.mp().Lock()
+
+    util.stats.register("memory cache", _stats)
+
+    global logger
+    logger = logging.getLogger(__name__)
+    logger.debug("initialized")
+
+def configure(config):
+    max_size = config.getint("size", 64) * 1024 * 1024
+    ttl = config.getint("ttl", 60)
+    init(max_size, ttl)
+
+
+def _sizeof(key, value):
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+def _remove(key):
+    global _size
+    value, size, expires = _entries.pop(key)
+    del value, expires
+    _size -= size
+
+class Cache(cache.CacheBase):
+    """an in-process cache, shared by all sessions of a process
+    
+    The least recently used entries are evicted to keep the total size of the keys and values within the budget.
+    Like with redis, an entry expires if it is not accessed within the TTL.
+    """
+
+    def connect(self):
+        pass
+
+    def close(self):
+        pass
+
+    def get(self, key):
+        now = time.time()
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                value, size, expires = entry
+                if _ttl and now >= expires:
+                    _remove(key)
+                    entry = None
+                else:
+                    _entries.move_to_end(key)
+                    if _ttl:
+                        _entries[key] = (value, size, now + _ttl)
+
+        if entry is None:
+            _counters.add("misses")
+            return None
+        _counters.add("hits")
+        return value
+
+    def set(self, key, value):
+        global _size
+
+        size = _sizeof(key, value)
+        expires = time.time() + _ttl if _ttl else None
+        evictions = 0
+        with _lock:
+            if key in _entries:
+                _remove(key)
+            if size > _max_size:
+                return
+
+            _entries[key] = (value, size, expires)
+            _size += size
+
+            while _size > _max_size:
+                oldest = next(iter(_entries))
+                _remove(oldest)
+                evictions += 1
+
+        if evictions:
+            _counters.add("evictions", evictions)
@@ -0,0 +1,77 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import logging
+
+import cache
+import cache.memory
+import cache.redis
+
+
+logger = None
+
+
+def configure(config):
+    cache.redis.configure(config)
+
+    local_size = config.getint("local-size", 64) * 1024 * 1024
+    local_ttl = config.getint("local-ttl", 10)
+    cache.memory.init(local_size, local_ttl)
+
+    global logger
+    logger = logging.getLogger(__name__)
+    logger.debug("initialized")
+
+
+class Cache(cache.CacheBase):
+    """a two-tier cache - an in-process cache in front of redis
+    
+    Lookups try the in-process cache first, and fill it from redis on a miss; updates go to both.
+    """
+
+    def __init__(self):
+        self._local = cache.memory.Cache()
+        self._remote = cache.redis.Cache()
+
+    def connect(self):
+        self._local.connect()
+        self._remote.connect()
+
+    def close(self):
+        self._remote.close()
+        self._local.close()
+
+    def get(self, key):
+        value = self._local.get(key)
+        if value is None:
+            value = self._remote.get(key)
+            if value is not None:
+                self._local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self._local.set(key, value)
+        self._remote.set(key, value)
@@ -24,12 +24,14 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+import re
+import functools
 import logging
 
-from pyparsing import ParserElement, Empty, Word, CharsNotIn, White, Optional, ZeroOrMore, OneOrMore, StringStart, StringEnd, Combine, Group, Suppress, nums, ParseException 
+from pyparsing import ParserElement, Empty, Word, CharsNotIn, White, Optional, ZeroOrMore, OneOrMore, StringStart, StringEnd, Combine, Group, Suppress, nums, restOfLine, ParseResults, ParseException
 
 import debug
-import modules
+import util.stats
 
 
 logger = None
@@ -51,38 +53,13 @@ _atom = Empty() + CharsNotIn(" '\"\\" + CTL)
 _string = Combine(OneOrMore(_dqstring | _sqstring | _quoted_pair))
 _word = Combine(OneOrMore(_atom | _string))
 
-_ws_state = ""
-
-def _ws_action(t):
-    global _ws_state
-    _ws_state = t[0]
-    return ""
-
-def _word_action(t):
-    global _ws_state
-    if _ws_state:
-        r = ''.join((_ws_state, t[0]))
-        _ws_state = ""
-        return r
-
-def _text_action(t):
-    global _ws_state
-    _ws_state = ""
-
-_text = Combine(OneOrMore(_word.copy().setParseAction(_word_action) | _ws.copy().setParseAction(_ws_action))).setParseAction(_text_action).setFailAction(lambda s, l, ex, err: _text_action(None))
+_text = Combine(_word + ZeroOrMore(_ws + _word))
 _description = _text.copy()
 
 
 _decimal = Word(nums).setParseAction(lambda t: int(t[0]))
 
-_cmd_state = None
-
-def _get_reset_cmd_state_action(cmd):
-    def _reset_cmd_state_action(t):
-        global _cmd_state
-        if cmd is None or (_cmd_state is not None and _cmd_state == cmd):
-            _cmd_state = None
-    return Empty().setParseAction(_reset_cmd_state_action)
+_command_names = {}
 
 def _get_keyword_action(kw):
     def _keyword_action(s, l, t):
@@ -94,17 +71,11 @@ def _get_keyword_action(kw):
 def _keyword(kw):
     return _word.copy().setParseAction(_get_keyword_action(kw))
 
-def _get_cmd_action(cmd):
-    def _cmd_action(t):
-        global _cmd_state
-        if _cmd_state is None:
-            _cmd_state = cmd
-        return cmd
-    return _cmd_action
-
 def _command(name, real=None):
-    cmd = _keyword(name) if name else Empty()
-    return cmd.addParseAction(_get_cmd_action(real or name))
+    if not name:
+        return Empty().setParseAction(lambda t: "")
+    _command_names[name] = real or name
+    return _keyword(name).addParseAction(lambda t: real or name)
 
 _start = StringStart()
 _end = StringEnd()
@@ -115,7 +86,7 @@ def _bound_command(body):
 def _command_string(body):
     cmd_str = _bound_command(body)
     if debug.enabled:
-        cmd_str |= _bound_command(_command("T") + _decimal + _get_reset_cmd_state_action("T") + Group(body))
+        cmd_str |= _bound_command(_command("T") + _decimal + Group(body))
     return cmd_str
 
 def _shortcut(s):
@@ -129,7 +100,7 @@ def make_grammar():
 
     show_params = show_db | show_strat | show_info | show_server
 
-    grammar = _command_string(_command("") + _get_reset_cmd_state_action(None))
+    grammar = _command_string(_command(""))
     grammar |= _command_string(_command("DEFINE") + _word + _word) | _command_string(_command("D", "DEFINE") + _shortcut("*") + _word) | _command_string(_command("D", "DEFINE") + _word + _word)
     grammar |= _command_string(_command("MATCH") + _word + _word + _word) | _command_string(_command("M", "MATCH") + _shortcut("*") + _shortcut(".") + _word) | _command_string(_command("M", "MATCH") + _shortcut("*") + _word + _word) | _command_string(_command("M", "MATCH") + _word + _word + _word)
     grammar |= _command_string(_command("SHOW") + show_params)
@@ -147,23 +118,210 @@ def make_grammar():
     return grammar
 
 _grammar = None
-
-_parser_lock = None
-
-
-def parse_command(line):
-    with _parser_lock:
-        try:
-            results = _grammar.parseString(line)
-            return True, results
-        except ParseException as pe:
-            logger.debug(pe)
-            return False, _cmd_state
-
-def init():
+_leading_word = None
+_time_prefix = None
+
+_cached_parse = None
+
+
+# fast path for common commands; anything it does not accept is left to the grammar
+
+_token_re = re.compile(r"""
+                       (?P<ws>[ \t]+)
+                       |(?P<atom>[^ '"\\\x00-\x1f\x7f]+)
+                       |"(?P<dq>(?:[^"\\\x00-\x1f\x7f]|\\.)*)"
+                       |'(?P<sq>(?:[^'\\\x00-\x1f\x7f]|\\.)*)'
+                       |\\(?P<qp>.)
+                       """, re.VERBOSE | re.DOTALL)
+
+_quoted_pair_re = re.compile(r"\\(.)", re.DOTALL)
+
+def _tokenize(line):
+    """splits a line to words, and the whitespace preceding each of them
+    
+    Returns None if the line contains anything but words and whitespace.
+    """
+
+    words = []
+    seps = []
+    sep = ""
+    word = None
+    pos = 0
+    length = len(line)
+    while pos < length:
+        m = _token_re.match(line, pos)
+        if m is None:
+            return None
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            if word is not None:
+                words.append(word)
+                seps.append(sep)
+                word = None
+            sep = m.group(kind)
+        else:
+            value = m.group(kind)
+            if kind in ("dq", "sq") and '\\' in value:
+                value = _quoted_pair_re.sub(r"\1", value)
+            word = value if word is None else word + value
+    if word is not None:
+        words.append(word)
+        seps.append(sep)
+    return words, seps
+
+def _fast_text(words, seps, start):
+    parts = [words[start]]
+    for i in range(start + 1, len(words)):
+        parts.append(seps[i])
+        parts.append(words[i])
+    return ''.join(parts)
+
+def _fast_define(words, seps, short):
+    nargs = len(words) - 1
+    if nargs == 2:
+        return ("DEFINE", words[1], words[2])
+    if short and nargs == 1:
+        return ("DEFINE", "*", words[1])
+    return None
+
+def _fast_match(words, seps, short):
+    nargs = len(words) - 1
+    if nargs == 3:
+        return ("MATCH", words[1], words[2], words[3])
+    if short and nargs == 2:
+        return ("MATCH", "*", words[1], words[2])
+    if short and nargs == 1:
+        return ("MATCH", "*", ".", words[1])
+    return None
+
+def _fast_show(words, seps, short):
+    nargs = len(words) - 1
+    if not nargs:
+        return None
+    param = words[1].upper()
+    if nargs == 1 and param in ("DB", "DATABASES", "STRAT", "STRATEGIES", "SERVER"):
+        return ("SHOW", param)
+    if nargs == 2 and param == "INFO":
+        return ("SHOW", param, words[2])
+    if param == "SERVER":
+        return ("SHOW", param, _fast_text(words, seps, 2))
+    return None
+
+def _fast_client(words, seps, short):
+    text = _fast_text(words, seps, 1) if len(words) > 1 else ""
+    return ("CLIENT", text)
+
+def _get_fast_simple(name):
+    def _fast_simple(words, seps, short):
+        if len(words) == 1:
+            return (name,)
+        return (name, _fast_text(words, seps, 1))
+    return _fast_simple
+
+_fast_commands = {
+                  "DEFINE": (_fast_define, False),
+                  "D": (_fast_define, True),
+                  "MATCH": (_fast_match, False),
+                  "M": (_fast_match, True),
+                  "SHOW": (_fast_show, False),
+                  "CLIENT": (_fast_client, False),
+                  "STATUS": (_get_fast_simple("STATUS"), False),
+                  "S": (_get_fast_simple("STATUS"), True),
+                  "HELP": (_get_fast_simple("HELP"), False),
+                  "H": (_get_fast_simple("HELP"), True),
+                  "QUIT": (_get_fast_simple("QUIT"), False),
+                  "Q": (_get_fast_simple("QUIT"), True),
+                 }
+
+def _parse_fast(line):
+    tokens = _tokenize(line)
+    if tokens is None:
+        return None
+    words, seps = tokens
+    if not words:
+        return ("",)
+    try:
+        parser, short = _fast_commands[words[0].upper()]
+    except KeyError:
+        return None
+    return parser(words, seps, short)
+
+
+def _command_name(line):
+    """returns the name of the command in a line, which failed to parse, or None if the command is not recognized"""
+
+    try:
+        if debug.enabled:
+            try:
+                rest = _time_prefix.parseString(line)[0]
+                return _command_name(rest)
+            except ParseException:
+                pass
+        word = _leading_word.parseString(line)[0]
+        return _command_names.get(word.upper())
+    except ParseException:
+        return None
+
+def _freeze(results):
+    return tuple(_freeze(r) if isinstance(r, ParseResults) else r for r in results)
+
+def _parse(line, fast_path):
+    if fast_path:
+        command = _parse_fast(line)
+        if command is not None:
+            return True, command
+    try:
+        results = _grammar.parseString(line)
+        return True, _freeze(results)
+    except ParseException as pe:
+        logger.debug(pe)
+        return False, _command_name(line)
+
+def parse_command(line, fast_path=True):
+    """parses a command line
+    
+    Returns a tuple (True, command) on success, or (False, name) on failure, where name is None if the command is not recognized.
+    The command is an immutable sequence, because results are shared between callers through a cache of recently parsed lines.
+    If fast_path is True, common commands are parsed without using the grammar.
+    """
+
+    if _cached_parse is not None:
+        return _cached_parse(line, fast_path)
+    return _parse(line, fast_path)
+
+# lines, whose parsing calls every keyword action of the grammar
+_warm_up_lines = ["X", "SHOW SERVER", "T 1 X"]
+
+def _warm_up():
+    """calls every parse action once, before the parser is shared between threads
+    
+    Pyparsing detects the arity of a parse action by calling it with fewer arguments first, which updates the action's state.
+    One-argument actions are detected on the first attempt, but the keyword actions take three arguments.
+    """
+
+    for line in _warm_up_lines:
+        _parse(line, False)
+    _time_prefix.parseString(_warm_up_lines[-1])
+
+def _stats():
+    info = _cached_parse.cache_info()
+    return [("hits", info.hits), ("misses", info.misses), ("size", info.currsize)]
+
+def init(cache_size=0):
     global logger
     logger = logging.getLogger(__name__)
-    global _parser_lock
-    _parser_lock = modules.mp().Lock()
-    global _grammar
+    global _grammar, _leading_word, _time_prefix
     _grammar = make_grammar()
+    _grammar.streamline()
+    _leading_word = _start + _word
+    _leading_word.streamline()
+    _time_prefix = _start + Suppress(_keyword("T") + _decimal) + restOfLine
+    _time_prefix.streamline()
+    _warm_up()
+    global _cached_parse
+    if cache_size:
+        _cached_parse = functools.lru_cache(cache_size)(_parse)
+        util.stats.register("parser cache", _stats)
+    else:
+        _cached_parse = None
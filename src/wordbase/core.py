@@ -48,26 +48,79 @@ def _send_banner(conn):
     msg_id = "<{}@{}>".format(local, _domain)
     conn.write_status(220, "{} {} {}".format(_fqdn, _server_string, msg_id))
 
-def _session(conn):
+def _command_loop(conn, backend, cacher):
+    start_session(conn)
+    conn.flush()
+
+    end = False
+    while not end:
+        lines = conn.read_lines()
+        end = execute_batch(conn, backend, cacher, lines)
+        conn.flush()
+
+def _session(conn, backend, cacher):
     try:
-        with modules.db().Backend() as backend, modules.cache().Cache() as cacher:
-            _send_banner(conn)
-
-            end = False
-            while not end:
-                line = conn.read_line()
-                correct, command = cmdparser.parse_command(line)
-                if correct:
-                    end = handlers.handle_command(conn, backend, cacher, command)
-                else:
-                    handlers.handle_syntax_error(conn, command)
+        if backend is None:
+            with modules.db().Backend() as backend, modules.cache().Cache() as cacher:
+                _command_loop(conn, backend, cacher)
+        else:
+            try:
+                _command_loop(conn, backend, cacher)
+            except (db.BackendError, cache.CacheError):
+                close_resources(backend, cacher)
+                raise
     except net.NetworkError:
         pass
     except (db.BackendError, cache.CacheError):
-        conn.write_status(420, "Server temporarily unavailable")
+        send_unavailable(conn)
     except Exception:
         logger.exception("unexpected error")
 
+def close_resources(*resources):
+    """closes back end and cache objects, ignoring errors
+    
+    The objects connect again on demand, so they remain usable.
+    """
+
+    for resource in resources:
+        try:
+            resource.close()
+        except (db.BackendError, cache.CacheError):
+            pass
+
+def start_session(conn):
+    _send_banner(conn)
+
+def send_unavailable(conn):
+    conn.write_status(420, "Server temporarily unavailable")
+
+def execute_command(conn, backend, cacher, line):
+    """parses and executes a command line
+    
+    Returns True if the session should be ended.
+    """
+
+    correct, command = cmdparser.parse_command(line)
+    if correct:
+        return handlers.handle_command(conn, backend, cacher, command)
+    else:
+        handlers.handle_syntax_error(conn, command)
+        return False
+
+def execute_batch(conn, backend, cacher, lines):
+    """executes a batch of pipelined command lines, in order
+    
+    Database and word list lookups are shared between the commands in the batch.
+    Returns True if the session should be ended, in which case the remaining commands are discarded.
+    """
+
+    if len(lines) > 1:
+        backend, cacher = handlers.shared_lookups(backend, cacher)
+    for line in lines:
+        if execute_command(conn, backend, cacher, line):
+            return True
+    return False
+
 def configure(config):
     global _fqdn, _server_string, _domain
     _fqdn = socket.getfqdn()
@@ -78,17 +131,32 @@ def configure(config):
     logger = logging.getLogger(__name__)
 
     net.init()
-    cmdparser.init()
+    parser_cache = config.getint("parser-cache", 1024)
+    cmdparser.init(parser_cache)
 
     info = config.get("info", "")
-    handlers.configure(_server_string, info)
+    max_matches = config.getint("max-matches", 1000)
+    handlers.configure(_server_string, info, max_matches)
+
+def reject_session(sock):
+    with sock, net.Connection(sock) as conn:
+        try:
+            send_unavailable(conn)
+            conn.flush()
+        except net.NetworkError:
+            pass
+
+def process_session(sock, addr, backend=None, cacher=None):
+    """serves a client session
+    
+    If backend and cacher are specified, they are used instead of per-session objects, and are not closed afterwards.
+    """
 
-def process_session(sock, addr):
     with sock, net.Connection(sock) as conn:
         host, port = addr
         logger.info("session started from address %s:%d", host, port)
         try:
-            _session(conn)
+            _session(conn, backend, cacher)
         finally:
             logger.info("session ended")
             logger.debug("closing client connection")
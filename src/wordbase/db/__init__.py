@@ -53,6 +53,9 @@ class BackendBase:
     def get_database_info(self, database):
         debug.not_impl(self)
 
+    def get_dictionary_id(self, database):
+        debug.not_impl(self)
+
     def get_words(self, database):
         debug.not_impl(self)
 
@@ -148,6 +148,15 @@ class Backend(db.BackendBase):
         rs = cur.fetchall()
         return list(zip(*rs))[0]
 
+    @pg_exc
+    @pg_conn
+    def get_dictionary_id(self, database):
+        dict_id, virt_id = self._get_ids(database)
+        del virt_id
+        if dict_id is None:
+            raise db.VirtualDatabaseError("database {} is not real".format(database))
+        return dict_id
+
     @pg_exc
     @pg_conn
     def get_words(self, database):
@@ -48,5 +48,8 @@ class NullConnection:
     def write_text(self, lines):
         pass
 
+    def flush(self):
+        pass
+
     def __getattr__(self, name):
         not_impl(self, name)
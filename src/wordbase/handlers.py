@@ -27,11 +27,14 @@
 import logging
 import time
 import collections
+import heapq
 
 import debug
 import helpmsg
 import db
 import match
+import wordindex
+import util.stats
 
 
 logger = None
@@ -40,6 +43,7 @@ STOP_DB_NAME = "--exit--"
 
 _server_string = ""
 _server_info = ""
+_max_matches = 0
 
 
 def handle_550(func):
@@ -79,7 +83,9 @@ def _handle_help(conn, *args):
     conn.write_status(250, "ok")
 
 def _handle_status(conn, *args):
-    conn.write_status(210, "up")
+    stats = util.stats.report()
+    status = "up [{}]".format(stats) if stats else "up"
+    conn.write_status(210, status)
 
 def _handle_client(conn, backend, cacher, command):
     logger.info("client: %s", command[1])
@@ -90,8 +96,7 @@ def _show_db(conn, backend):
     n = len(dbs)
     if n:
         conn.write_status(110, "{} databases present - text follows".format(n))
-        dbs.sort(key=lambda t: t[1])
-        for db in dbs:
+        for db in sorted(dbs, key=lambda t: t[1]):
             name, virtual, short_desc = db
             del virtual
             line = "{} \"{}\"".format(name, _escaped(short_desc))
@@ -163,64 +168,47 @@ def _handle_show(conn, backend, cacher, command):
     else:
         assert False, "unhandled SHOW command"
 
-def _retrieve_words(backend, cacher, db_name):
-    def parse_list(data):
-        items = data.splitlines()
-        return items
-
-    def format_list(items):
-        mangle = len(items) > 0 and len(items[-1]) == 0
-        if mangle:
-            items.append("")
-        formatted = '\n'.join(items)
-        if mangle:
-            del items[-1]
-        return formatted
-
-    words_name = "words:{}".format(db_name)
-    preproc_name = "preproc:{}".format(db_name)
-
-    words_cache = cacher.get(words_name)
-    if words_cache is not None:
-        words = parse_list(words_cache)
-    else:
-        words = backend.get_words(db_name)
-        formatted = format_list(words)
-        cacher.set(words_name, formatted)
-
-    preproc_cache = cacher.get(preproc_name)
-    if preproc_cache is not None:
-        preprocessed = parse_list(preproc_cache)
-    else:
-        preprocessed = match.preprocessed(words)
-        formatted = format_list(preprocessed)
-        cacher.set(preproc_name, formatted)
+def _best_matches(word, db_matches, limit):
+    """returns the best limit matches of all databases, ranked together, but listed in their database order"""
 
-    return words, preprocessed
+    ranked = ((match.rank_key(word, m), order, pos) for order, (name, matches) in enumerate(db_matches) for pos, m in enumerate(matches))
+    best = set((order, pos) for key, order, pos in heapq.nsmallest(limit, ranked))
+    return [(name, [m for pos, m in enumerate(matches) if (order, pos) in best]) for order, (name, matches) in enumerate(db_matches)]
 
 def _find_matches(conn, backend, cacher, dbs, database, strategy, word, defs):
-    def get_matches(db_name):
+    """finds the matches of word in the specified databases
+    
+    Unless looking for definitions, at most the configured maximum number of matches are returned, with the best ones selected from all databases.
+    One more match than allowed is looked up in each database, to tell if the result is truncated.
+    The result is also truncated if a pattern search was stopped early by its budget.
+    A single word filter is used for all databases, so that pattern searches share one time and result budget.
+    """
+
+    def get_matches(db_name, limit):
         def add_matches(db_name):
-            words, preprocessed = _retrieve_words(backend, cacher, db_name)
-            filtered = word_filter(word, words, preprocessed)
+            index = wordindex.get_index(backend, cacher, db_name)
+            filtered, stopped = word_filter(word, index, limit + 1 if limit is not None else None)
             if defs:
                 matches = [(wd, []) for wd in filtered]
             else:
                 matches = filtered
             item = (db_name, matches)
             ml.append(item)
-            return len(matches)
+            return len(matches), stopped
 
         nmatches = 0
+        stopped = False
         ml = []
         virtual, short_desc = dbs[db_name]
         del short_desc
         if not virtual:
-            nmatches += add_matches(db_name)
+            nmatches, stopped = add_matches(db_name)
         else:
             for name in backend.get_virtual_database(db_name):
-                nmatches += add_matches(name)
-        return nmatches, ml
+                nm, st = add_matches(name)
+                nmatches += nm
+                stopped = stopped or st
+        return nmatches, ml, stopped
 
     _validate_db_name(database)
 
@@ -233,6 +221,8 @@ def _find_matches(conn, backend, cacher, dbs, database, strategy, word, defs):
         return
 
     num_matches = 0
+    stopped = False
+    max_matches = _max_matches if _max_matches and not defs else None
 
     db_match_defs = []
     if database in ("*", "!"):
@@ -242,19 +232,26 @@ def _find_matches(conn, backend, cacher, dbs, database, strategy, word, defs):
                 continue
             if name == STOP_DB_NAME:
                 break
-            nm, ml = get_matches(name)
+            nm, ml, st = get_matches(name, max_matches)
             assert len(ml) == 1, "virtual database detected"
             db_match_defs.extend(ml)
             num_matches += nm
+            stopped = stopped or st
             if database == "!":
                 if nm:
                     break
     else:
-        nm, ml = get_matches(database)
+        nm, ml, stopped = get_matches(database, max_matches)
         db_match_defs.extend(ml)
         num_matches = nm
 
-    return db_match_defs, num_matches
+    truncated = stopped
+    if max_matches is not None and num_matches > max_matches:
+        truncated = True
+        db_match_defs = _best_matches(word, db_match_defs, max_matches)
+        num_matches = max_matches
+
+    return db_match_defs, num_matches, truncated
 
 def _get_dbs(backend):
     dbs = collections.OrderedDict([(name, (virtual, short_desc)) for (name, virtual, short_desc) in backend.get_databases()])
@@ -267,13 +264,14 @@ def _handle_match(conn, backend, cacher, command):
     word = command[3]
 
     dbs = _get_dbs(backend)
-    db_matches, num_matches = _find_matches(conn, backend, cacher, dbs, database, strategy, word, False)
+    db_matches, num_matches, truncated = _find_matches(conn, backend, cacher, dbs, database, strategy, word, False)
 
     if not num_matches:
         conn.write_status(552, "No match")
         return
 
-    conn.write_status(152, "{} matches found - text follows".format(num_matches))
+    truncation = " (truncated)" if truncated else ""
+    conn.write_status(152, "{} matches found{} - text follows".format(num_matches, truncation))
 
     for name, matches in db_matches:
         for m in matches:
@@ -289,8 +287,8 @@ def _handle_define(conn, backend, cacher, command):
     word = command[2]
 
     dbs = _get_dbs(backend)
-    db_match_defs, num_matches = _find_matches(conn, backend, cacher, dbs, database, "exact", word, True)
-    del num_matches
+    db_match_defs, num_matches, truncated = _find_matches(conn, backend, cacher, dbs, database, "exact", word, True)
+    del num_matches, truncated
 
     num_defs = 0
 
@@ -348,6 +346,48 @@ _cmd_handlers = {
                 }
 
 
+class _SharedBackend:
+    _shared = ("get_databases", "get_database_info", "get_dictionary_id", "get_words", "get_virtual_database")
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._results = {}
+
+    def __getattr__(self, name):
+        func = getattr(self._backend, name)
+        if name not in self._shared:
+            return func
+
+        def shared_func(*args):
+            key = (name,) + args
+            if key not in self._results:
+                self._results[key] = func(*args)
+            return self._results[key]
+        return shared_func
+
+class _SharedCache:
+    def __init__(self, cacher):
+        self._cacher = cacher
+        self._values = {}
+
+    def get(self, key):
+        if key not in self._values:
+            self._values[key] = self._cacher.get(key)
+        return self._values[key]
+
+    def set(self, key, value):
+        self._cacher.set(key, value)
+        self._values[key] = value
+
+    def __getattr__(self, name):
+        return getattr(self._cacher, name)
+
+
+def shared_lookups(backend, cacher):
+    """returns proxies of backend and cacher, which share lookup results between the commands of a batch"""
+
+    return _SharedBackend(backend), _SharedCache(cacher)
+
 def handle_syntax_error(conn, command):
     if command is None:
         code, msg = 500, "Syntax error, command not recognized"
@@ -360,9 +400,10 @@ def handle_command(conn, backend, cacher, command):
     handler = _cmd_handlers.get(name, _not_implemented)
     return handler(conn, backend, cacher, command)
 
-def configure(server_string, server_info):
-    global _server_string, _server_info
+def configure(server_string, server_info, max_matches):
+    global _server_string, _server_info, _max_matches
     _server_string = server_string
     _server_info = server_info
+    _max_matches = max_matches
     global logger
     logger = logging.getLogger(__name__)
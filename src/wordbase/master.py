@@ -31,10 +31,11 @@ import signal
 import errno
 import logging
 
+from mp import OverloadError
 import core
 
 
-_sock = None
+_socks = []
 
 logger = None
 
@@ -62,9 +63,21 @@ def _accept_connections(sock, timeout, mp):
 
         conn.settimeout(timeout)
 
-        mp.process(core.process_session, conn, addr)
-
-def init(address, backlog):
+        try:
+            mp.process(core.process_session, conn, addr)
+        except OverloadError:
+            core.reject_session(conn)
+
+def _listen(address, backlog, reuse_port):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    return sock
+
+def init(address, backlog, mp):
     global logger
     logger = logging.getLogger(__name__)
 
@@ -72,11 +85,11 @@ def init(address, backlog):
 
     signal.signal(signal.SIGTERM, _sigterm_handler)
 
-    global _sock
-    _sock = socket.socket()
-    _sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    _sock.bind(address)
-    _sock.listen(backlog)
+    num_listeners = mp.num_listeners() if hasattr(mp, "num_listeners") else 1
+    reuse_port = num_listeners > 1
+
+    global _socks
+    _socks = [_listen(address, backlog, reuse_port) for i in range(num_listeners)]
 
     host, port = address
     logger.info("listening at address %s:%d", host, port)
@@ -84,7 +97,10 @@ def init(address, backlog):
 def run(timeout, mp):
     pid = os.getpid()
     try:
-        _accept_connections(_sock, timeout, mp)
+        if hasattr(mp, "serve"):
+            mp.serve(_socks, timeout)
+        else:
+            _accept_connections(_socks[0], timeout, mp)
     finally:
         if os.getpid() == pid:
             logger.info("server stopped")
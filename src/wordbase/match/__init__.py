@@ -0,0 +1,285 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import collections
+import functools
+import array
+import heapq
+
+from match.normalize import normalize, normalize_all
+from match.index import WordIndex
+from match.trie import TrieIndex
+from match.mapped import MappedIndex, write_index
+from match.suffixarray import SuffixArray
+from match.reverse import ReversedIndex
+from match.tokens import TokenIndex
+from match.ngram import NgramIndex
+from match.scan import Scanner
+from match.phonetic import PhoneticIndex, soundex, metaphone
+from match import pattern
+
+
+class InvalidStrategyError(ValueError):
+    pass
+
+
+# changes whenever preprocessing changes, so that stored preprocessed headwords are not reused
+PREPROCESS_VERSION = 2
+
+
+_preprocess = normalize
+
+
+def _match_exact(index, word):
+    lo, hi = index.exact_range(word)
+    return index.range_ids(lo, hi)
+
+def _match_prefix(index, word):
+    lo, hi = index.prefix_range(word)
+    return index.range_ids(lo, hi)
+
+def _next_row(row, char, word):
+    new_row = [row[0] + 1]
+    for j, word_char in enumerate(word):
+        new_row.append(min(row[j + 1] + 1, new_row[j] + 1, row[j] + (word_char != char)))
+    return new_row
+
+def _match_lev(index, word):
+    """walks the implicit trie of the sorted headwords, keeping a row of the edit distance table for each visited prefix
+    
+    Below prefixes that already need the maximum distance, only the characters of word that can keep the distance are tried.
+    Elsewhere, the distinct next characters are enumerated by jumping over the sorted range of each one.
+    """
+
+    ids = array.array('I')
+    lo, hi = index.prefix_range("")
+    stack = [("", list(range(len(word) + 1)), lo, hi)]
+
+    while stack:
+        prefix, row, lo, hi = stack.pop()
+        depth = len(prefix)
+
+        exact_lo, exact_hi = index.exact_range(prefix)
+        mid = lo + (exact_hi - exact_lo)
+        if row[-1] <= _max_distance:
+            ids.extend(index.range_ids(lo, mid))
+
+        if min(row) < _max_distance:
+            pos = mid
+            while pos < hi:
+                char = index.key(pos)[depth]
+                child = prefix + char
+                child_lo, child_hi = index.prefix_range(child)
+                child_row = _next_row(row, char, word)
+                if min(child_row) <= _max_distance:
+                    stack.append((child, child_row, child_lo, child_hi))
+                pos = child_hi
+        else:
+            chars = {word[j] for j in range(len(word)) if row[j] == _max_distance}
+            for char in chars:
+                child = prefix + char
+                child_lo, child_hi = index.prefix_range(child)
+                if child_lo < child_hi:
+                    child_row = _next_row(row, char, word)
+                    if min(child_row) <= _max_distance:
+                        stack.append((child, child_row, child_lo, child_hi))
+
+    return ids
+
+def _match_substring(index, word):
+    scanner = _optional_component(index, "scanner")
+    if scanner is not None:
+        return scanner.search_substring(word)
+    return _component(index, "suffixes").search(word)
+
+def _match_suffix(index, word):
+    scanner = _optional_component(index, "scanner")
+    if scanner is not None:
+        return scanner.search_suffix(word)
+    return _component(index, "reversed").search(word)
+
+def _match_word(index, word):
+    return _component(index, "tokens").search(word)
+
+def _match_soundex(index, word):
+    return _component(index, "soundex").search(word)
+
+def _match_metaphone(index, word):
+    return _component(index, "metaphone").search(word)
+
+def _match_re(budget, index, word):
+    return pattern.search(index, pattern.compile_regex(word), functools.partial(_optional_component, index), budget)
+
+def _match_glob(budget, index, word):
+    return pattern.search(index, pattern.compile_glob(word), functools.partial(_optional_component, index), budget)
+
+_max_distance = 1
+
+_strategies = collections.OrderedDict((
+                                       ("exact", ("Match headwords exactly", _match_exact)),
+                                       ("prefix", ("Match prefixes", _match_prefix)),
+                                       ("substring", ("Match substring occurring anywhere in a headword", _match_substring)),
+                                       ("suffix", ("Match suffixes", _match_suffix)),
+                                       ("word", ("Match separate words within headwords", _match_word)),
+                                       ("lev", ("Match headwords within Levenshtein distance one", _match_lev)),
+                                       ("soundex", ("Match using SOUNDEX algorithm", _match_soundex)),
+                                       ("metaphone", ("Match using METAPHONE algorithm", _match_metaphone)),
+                                       ("re", ("Regular expressions, matched anywhere in a headword", _match_re)),
+                                       ("glob", ("Shell-style wildcards", _match_glob)),
+                                     ))
+
+_component_types = {
+                    "suffixes": SuffixArray,
+                    "reversed": ReversedIndex,
+                    "tokens": TokenIndex,
+                    "trigrams": NgramIndex,
+                    "scanner": Scanner,
+                    "soundex": functools.partial(PhoneticIndex, soundex),
+                    "metaphone": functools.partial(PhoneticIndex, metaphone),
+                   }
+
+_strategy_components = {
+                        "substring": ("suffixes",),
+                        "suffix": ("reversed",),
+                        "word": ("tokens",),
+                        "soundex": ("soundex",),
+                        "metaphone": ("metaphone",),
+                        "re": ("trigrams",),
+                        "glob": ("trigrams",),
+                       }
+
+# strategies, whose queries are patterns, which must not be preprocessed, and whose searches share a budget per filter
+_verbatim_strategies = {"re", "glob"}
+
+# strategies, whose matches come in index order, which starts with the exact matches
+_exact_first_strategies = {"exact", "prefix"}
+
+_default_strategy = "prefix"
+
+
+def preprocessed(headwords):
+    return normalize_all(headwords)
+
+def _component(index, name):
+    return index.get_component(name, _component_types[name])
+
+def _optional_component(index, name):
+    """returns a component of an index, or None if no enabled strategy uses it"""
+
+    enabled = any(name in _strategy_components.get(strategy, ()) for strategy in _strategies)
+    return _component(index, name) if enabled else None
+
+def _rank(index, word, ids, limit, exact_first):
+    """returns the ids of the best matches - exact matches first, then shorter headwords, then earlier headwords in the dictionary
+    
+    If the matches start with the exact ones, these are ranked on their own, and the rest only if there are not enough exact matches.
+    """
+
+    def length_key(i):
+        return len(headword(i)), i
+
+    headword = index.headword
+    lo, hi = index.exact_range(word)
+    if exact_first:
+        num_exact = hi - lo
+        if num_exact >= limit:
+            return heapq.nsmallest(limit, ids[:num_exact], key=length_key)
+        return sorted(ids[:num_exact], key=length_key) + heapq.nsmallest(limit - num_exact, ids[num_exact:], key=length_key)
+    exact = set(index.range_ids(lo, hi))
+    return heapq.nsmallest(limit, ids, key=lambda i: (i not in exact,) + length_key(i))
+
+def rank_key(word, headword):
+    """returns the sort key of a headword matched by word - exact matches first, then shorter headwords"""
+
+    return (_preprocess(headword) != _preprocess(word), len(headword))
+
+def _filter_words(search, preprocess, exact_first, budget, word, index, limit=None):
+    """returns the matching headwords, and whether the search was stopped early by the budget of the filter
+    
+    The headwords are in their original order, or the best limit of them in rank order, if there are at least as many.
+    """
+
+    if preprocess:
+        word = _preprocess(word)
+    ids = search(index, word)
+    stopped = budget is not None and budget.stopped
+    if limit is not None and len(ids) >= limit:
+        return [index.headword(i) for i in _rank(index, word, ids, limit, exact_first)], stopped
+    return index.get_headwords(ids), stopped
+
+def get_filter(strategy=None):
+    """returns a function, which filters the headwords of an index with a strategy; a filter is meant for a single command"""
+
+    if strategy is None:
+        strategy = _default_strategy
+    try:
+        strat = _strategies[strategy]
+    except KeyError:
+        raise InvalidStrategyError("invalid strategy: {}".format(strategy))
+    desc, search = strat
+    del desc
+    preprocess = strategy not in _verbatim_strategies
+    budget = None
+    if not preprocess:
+        budget = pattern.Budget()
+        search = functools.partial(search, budget)
+    exact_first = strategy in _exact_first_strategies
+    word_filter = functools.partial(_filter_words, search, preprocess, exact_first, budget)
+    return word_filter
+
+def get_strategies():
+    func = None
+    func = func
+    strats = collections.OrderedDict([(name, desc) for name, (desc, func) in _strategies.items()])
+    return strats
+
+def configure_index(config):
+    if config.getboolean("scanner", False):
+        _strategy_components["substring"] = ("scanner",)
+        _strategy_components["suffix"] = ("scanner",)
+
+def configure(config):
+    pattern.configure(config)
+
+    strategies = config.get("strategies", "")
+    if strategies:
+        parts = strategies.split(':')
+        default, strats = parts
+
+        global _strategies, _default_strategy
+        user_strats = collections.OrderedDict()
+        for strat in strats.split(','):
+            name = strat.strip()
+            if name:
+                if name not in _strategies:
+                    raise ValueError("unsupported strategy: {}".format(name))
+                user_strats[name] = _strategies[name]
+        _strategies = user_strats
+
+        default = default.strip()
+        if default not in _strategies:
+            raise ValueError("default strategy not in list of advertised strategies")
+        _default_strategy = default
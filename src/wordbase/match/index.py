@@ -0,0 +1,179 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import bisect
+import array
+import threading
+
+
+def successor(prefix):
+    """returns the least string, which is greater than all strings that start with prefix, or None if there is no such string"""
+
+    chars = list(prefix)
+    while chars:
+        code = ord(chars[-1])
+        if code < sys.maxunicode:
+            chars[-1] = chr(code + 1)
+            return ''.join(chars)
+        del chars[-1]
+    return None
+
+def sizeof_strings(strings):
+    return sys.getsizeof(strings) + sum(map(sys.getsizeof, strings))
+
+
+class StringTable:
+    """an immutable sequence of strings, packed into a single utf-8 buffer with an array of offsets"""
+
+    def __init__(self, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = array.array('I', [0])
+        total = 0
+        for data in encoded:
+            total += len(data)
+            offsets.append(total)
+        self._data = b''.join(encoded)
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        offsets = self._offsets
+        return self._data[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+    def memory_size(self):
+        return sys.getsizeof(self._data) + sys.getsizeof(self._offsets)
+
+
+class IndexBase:
+    """common functionality of word indexes
+    
+    Besides the sorted headwords, an index can hold components - auxiliary structures, which serve particular strategies.
+    Components refer to headwords by the same ids as the index.
+    They are built when they are first needed, so that the cost is only paid for strategies that are actually used.
+    """
+
+    def __init__(self):
+        self._components = {}
+        self._components_lock = threading.Lock()
+        self._index_size = None
+        self._components_size = 0
+
+    def get_component(self, name, factory):
+        """returns a component of the index, building it with factory on first use"""
+
+        component = self._components.get(name)
+        if component is None:
+            with self._components_lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = factory(self)
+                    self._components_size += component.memory_size()
+                    self._components[name] = component
+        return component
+
+    def keys(self):
+        """returns an iterable of the preprocessed headwords in sorted order"""
+
+        return map(self.key, range(len(self)))
+
+    def range_keys(self, lo, hi):
+        """returns an iterable of the preprocessed headwords in a range of sorted positions"""
+
+        return map(self.key, range(lo, hi))
+
+    def memory_size(self):
+        """returns the approximate number of bytes used by the index and its components
+        
+        The index is measured on the first call, which is made when it is built, and each component when it is built, so that reporting the size is cheap.
+        """
+
+        if self._index_size is None:
+            self._index_size = self._memory_size()
+        return self._index_size + self._components_size
+
+
+class WordIndex(IndexBase):
+    """an index of the headwords of a dictionary
+    
+    The preprocessed headwords are kept sorted, along with a permutation back to the original headwords.
+    Headwords are identified by their positions in the original list.
+    """
+
+    def __init__(self, headwords, preprocessed):
+        super().__init__()
+        order = sorted(range(len(preprocessed)), key=preprocessed.__getitem__)
+        self._headwords = headwords
+        self._keys = [preprocessed[i] for i in order]
+        self._order = array.array('I', order)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def exact_range(self, key):
+        """returns the range of sorted positions of the headwords equal to key"""
+
+        keys = self._keys
+        lo = bisect.bisect_left(keys, key)
+        hi = bisect.bisect_right(keys, key, lo)
+        return lo, hi
+
+    def prefix_range(self, prefix):
+        """returns the range of sorted positions of the headwords starting with prefix"""
+
+        keys = self._keys
+        lo = bisect.bisect_left(keys, prefix)
+        upper = successor(prefix)
+        hi = bisect.bisect_left(keys, upper, lo) if upper is not None else len(keys)
+        return lo, hi
+
+    def key(self, pos):
+        """returns the preprocessed headword at a sorted position"""
+
+        return self._keys[pos]
+
+    def keys(self):
+        return self._keys
+
+    def range_keys(self, lo, hi):
+        return self._keys[lo:hi]
+
+    def range_ids(self, lo, hi):
+        return self._order[lo:hi]
+
+    def headword(self, headword_id):
+        return self._headwords[headword_id]
+
+    def get_headwords(self, ids):
+        """returns the headwords with the specified ids, in their original order"""
+
+        headwords = self._headwords
+        return [headwords[i] for i in sorted(ids)]
+
+    def _memory_size(self):
+        return sizeof_strings(self._keys) + sizeof_strings(self._headwords) + sys.getsizeof(self._order)
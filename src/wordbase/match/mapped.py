@@ -0,0 +1,200 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import mmap
+import struct
+import bisect
+import array
+
+from match.index import IndexBase
+
+
+_MAGIC = b"WBIX"
+# also changed whenever preprocessing changes, so that files with outdated preprocessed headwords are rejected
+_VERSION = 2
+
+_header = struct.Struct("=4sIII")
+
+
+def _aligned(size):
+    return (size + 3) & ~3
+
+def _pad(data):
+    return data + b"\0" * (_aligned(len(data)) - len(data))
+
+def _pack_strings(strings):
+    encoded = [s.encode("utf-8", "surrogatepass") for s in strings]
+    offsets = array.array('I', [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    return offsets, b''.join(encoded)
+
+def _byte_successor(prefix):
+    """returns the least byte string, which is greater than all utf-8 strings that start with prefix"""
+
+    # utf-8 never contains the byte 0xff, so the last byte can always be incremented
+    return prefix[:-1] + bytes((prefix[-1] + 1,))
+
+def write_index(path, headwords, preprocessed, stamp):
+    """writes an index of the headwords of a dictionary to a file, which can be mapped by MappedIndex
+    
+    The file holds the sorted preprocessed headwords and the original headwords, both as offsets into utf-8 data, and the permutation between them.
+    It is written to a temporary file first, which then replaces the target, so that running servers never see a partial file.
+    """
+
+    order = sorted(range(len(preprocessed)), key=preprocessed.__getitem__)
+    key_offsets, key_data = _pack_strings(preprocessed[i] for i in order)
+    word_offsets, word_data = _pack_strings(headwords)
+    order = array.array('I', order)
+    stamp = stamp.encode("utf-8")
+
+    sections = (
+                _header.pack(_MAGIC, _VERSION, len(order), len(stamp)),
+                _pad(stamp),
+                key_offsets.tobytes(),
+                order.tobytes(),
+                word_offsets.tobytes(),
+                _pad(key_data),
+                word_data,
+               )
+
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(temp_path, "wb") as f:
+            for data in sections:
+                f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class _Keys:
+    """a sequence of the sorted preprocessed headwords in a mapped index file, as utf-8 byte strings"""
+
+    def __init__(self, buf, base, offsets):
+        self._buf = buf
+        self._base = base
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        base = self._base
+        offsets = self._offsets
+        return self._buf[base + offsets[i]:base + offsets[i + 1]]
+
+
+class MappedIndex(IndexBase):
+    """an index of the headwords of a dictionary, mapped from a file written by write_index
+    
+    Lookups work directly on the mapped file, so all processes that map it share a single copy in the page cache.
+    Byte strings are compared in place of the preprocessed headwords, because utf-8 preserves the ordering of code points.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(buf) < _header.size:
+            raise ValueError("truncated index file: {}".format(path))
+        magic, version, count, stamp_length = _header.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("unsupported index file: {}".format(path))
+
+        pos = _header.size
+        self.stamp = buf[pos:pos + stamp_length].decode("utf-8")
+        pos += _aligned(stamp_length)
+
+        view = memoryview(buf)
+        sections = []
+        for length in (count + 1, count, count + 1):
+            end = pos + 4 * length
+            sections.append(view[pos:end].cast('I'))
+            pos = end
+        key_offsets, order, word_offsets = sections
+        key_base = pos
+        word_base = key_base + _aligned(key_offsets[-1])
+        if word_base + word_offsets[-1] != len(buf):
+            raise ValueError("corrupt index file: {}".format(path))
+
+        self._buf = buf
+        self._keys = _Keys(buf, key_base, key_offsets)
+        self._order = order
+        self._words = _Keys(buf, word_base, word_offsets)
+
+    def __len__(self):
+        return len(self._order)
+
+    def exact_range(self, key):
+        """returns the range of sorted positions of the headwords equal to key"""
+
+        keys = self._keys
+        key = key.encode("utf-8", "surrogatepass")
+        lo = bisect.bisect_left(keys, key)
+        hi = bisect.bisect_right(keys, key, lo)
+        return lo, hi
+
+    def prefix_range(self, prefix):
+        """returns the range of sorted positions of the headwords starting with prefix"""
+
+        keys = self._keys
+        if not prefix:
+            return 0, len(keys)
+        prefix = prefix.encode("utf-8", "surrogatepass")
+        lo = bisect.bisect_left(keys, prefix)
+        hi = bisect.bisect_left(keys, _byte_successor(prefix), lo)
+        return lo, hi
+
+    def key(self, pos):
+        """returns the preprocessed headword at a sorted position"""
+
+        return self._keys[pos].decode("utf-8", "surrogatepass")
+
+    def range_ids(self, lo, hi):
+        ids = array.array('I')
+        ids.frombytes(self._order[lo:hi].cast('B'))
+        return ids
+
+    def headword(self, headword_id):
+        return self._words[headword_id].decode("utf-8", "surrogatepass")
+
+    def get_headwords(self, ids):
+        """returns the headwords with the specified ids, in their original order"""
+
+        words = self._words
+        return [words[i].decode("utf-8", "surrogatepass") for i in sorted(ids)]
+
+    def _memory_size(self):
+        # the mapping is shared with other processes
+        return len(self._buf)
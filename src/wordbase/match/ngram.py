@@ -0,0 +1,107 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import bisect
+import array
+
+from match.index import StringTable
+
+
+def intersect(a, b):
+    """returns the sorted values, which are common to two sorted arrays
+    
+    Values of the shorter array are searched for by galloping through the longer one, if it is much longer.
+    Otherwise, the arrays are intersected as sets.
+    """
+
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) * 16 < len(b):
+        result = array.array('I')
+        lo = 0
+        for value in a:
+            lo = bisect.bisect_left(b, value, lo)
+            if lo == len(b):
+                break
+            if b[lo] == value:
+                result.append(value)
+        return result
+    return array.array('I', sorted(set(a).intersection(b)))
+
+
+class NgramIndex:
+    """an inverted index from the n-grams of the preprocessed headwords of an index to their sorted positions
+    
+    The distinct n-grams are packed into a sorted string table, and the postings of all n-grams into a single array of positions.
+    It produces candidates, which contain all n-grams of some literal strings, and which must still be verified.
+    """
+
+    def __init__(self, index, n=3):
+        postings = {}
+        for pos, key in enumerate(index.keys()):
+            for gram in {key[i:i + n] for i in range(len(key) - n + 1)}:
+                if gram not in postings:
+                    postings[gram] = array.array('I')
+                postings[gram].append(pos)
+
+        grams = sorted(postings)
+        offsets = array.array('I', [0])
+        flat = array.array('I')
+        for gram in grams:
+            flat.extend(postings.pop(gram))
+            offsets.append(len(flat))
+
+        self._n = n
+        self._grams = StringTable(grams)
+        self._offsets = offsets
+        self._postings = flat
+
+    def _postings_of(self, gram):
+        grams = self._grams
+        i = bisect.bisect_left(grams, gram)
+        if i == len(grams) or grams[i] != gram:
+            return array.array('I')
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+    def candidates(self, literals):
+        """returns the sorted positions of the headwords, which contain all n-grams of the literals, or None if the literals are too short to have any"""
+
+        n = self._n
+        grams = {literal[i:i + n] for literal in literals for i in range(len(literal) - n + 1)}
+        if not grams:
+            return None
+
+        postings = sorted(map(self._postings_of, grams), key=len)
+        result = postings[0]
+        for positions in postings[1:]:
+            if not result:
+                break
+            result = intersect(result, positions)
+        return result
+
+    def memory_size(self):
+        return self._grams.memory_size() + sys.getsizeof(self._offsets) + sys.getsizeof(self._postings)
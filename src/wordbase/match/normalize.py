@@ -0,0 +1,81 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import string
+import unicodedata
+
+
+class _FoldingTable(dict):
+    """a translation table, which case folds characters and removes diacritics and punctuation
+    
+    Whitespace becomes plain spaces, except for newlines, which are kept, so that many words can be normalized at once.
+    The mapping of a character is computed when it is first seen, and is kept for later use.
+    """
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char == '\n':
+            value = char
+        elif char.isspace():
+            value = ' '
+        elif char in string.punctuation or unicodedata.category(char).startswith('P') or unicodedata.combining(char):
+            value = None
+        else:
+            folded = unicodedata.normalize("NFKD", char.casefold())
+            value = ''.join(c for c in folded if not unicodedata.combining(c))
+        self[code] = value
+        return value
+
+
+_table = _FoldingTable()
+for code in range(128):
+    _table[code]
+del code
+
+
+def _is_ascii(text):
+    return max(text, default="") < "\x80"
+
+def normalize(word):
+    """returns the normalized form of a word - case folded, without diacritics and punctuation, and with single spaces between its parts"""
+
+    if not _is_ascii(word):
+        word = unicodedata.normalize("NFKD", word)
+    return ' '.join(word.translate(_table).split())
+
+def normalize_all(words):
+    """returns the normalized forms of many words, which must not contain newlines
+    
+    The words are joined, so that decomposition and translation run once over all of them.
+    """
+
+    text = '\n'.join(words)
+    if not _is_ascii(text):
+        text = unicodedata.normalize("NFKD", text)
+    lines = text.translate(_table).split('\n')
+    if len(lines) != len(words):
+        return list(map(normalize, words))
+    return [' '.join(line.split()) for line in lines]
@@ -0,0 +1,300 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import re
+import fnmatch
+import time
+import array
+import logging
+
+from match.normalize import normalize
+
+
+logger = None
+
+_timeout = 0
+_max_results = 0
+
+_check_interval = 256
+
+_max_pattern_length = 256
+_max_unbounded_repeats = 3
+
+_regex_special = set(".^$*+?{}[]\\|()")
+_glob_special = set("*?[")
+
+
+def configure(config):
+    global _timeout, _max_results
+    _timeout = config.getfloat("pattern-timeout", 1.0)
+    _max_results = config.getint("pattern-max-results", 1000)
+
+    global logger
+    logger = logging.getLogger(__name__)
+
+def _skip_class(pattern, i):
+    """returns the position after the character class starting at position i"""
+
+    i += 1
+    if i < len(pattern) and pattern[i] in "!^":
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        if pattern[i] == '\\':
+            i += 1
+        i += 1
+    return i + 1
+
+def _unsafe_regex(pattern):
+    """returns the reason why a regular expression may backtrack catastrophically, or None if it is considered safe
+    
+    Repeated groups that contain repeats or alternatives, and patterns with many unbounded repeats are rejected.
+    The check is conservative - some safe patterns are rejected too.
+    """
+
+    if len(pattern) > _max_pattern_length:
+        return "pattern too long"
+
+    groups = []
+    unbounded = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+        elif char == '[':
+            i = _skip_class(pattern, i)
+        elif char == '(':
+            groups.append(False)
+            i += 1
+            if i < len(pattern) and pattern[i] == '?':
+                i += 1
+        elif char == ')':
+            ambiguous = groups.pop() if groups else False
+            i += 1
+            if ambiguous and i < len(pattern) and pattern[i] in "*+?{":
+                return "repeated group contains a repeat or an alternative"
+            if ambiguous and groups:
+                groups[-1] = True
+        elif char == '|':
+            if groups:
+                groups[-1] = True
+            i += 1
+        elif char in "*+?{":
+            if char == '{':
+                end = pattern.find('}', i)
+                if end < 0:
+                    end = len(pattern)
+                if pattern[i:end].endswith(','):
+                    unbounded += 1
+                i = end
+            elif char != '?':
+                unbounded += 1
+            if groups:
+                groups[-1] = True
+            i += 1
+            if i < len(pattern) and pattern[i] in "?+":
+                i += 1
+        else:
+            i += 1
+
+    if unbounded > _max_unbounded_repeats:
+        return "too many unbounded repeats"
+    return None
+
+def _regex_literals(pattern):
+    """returns the literal prefix of an anchored regular expression, and runs of literal characters that any match must contain
+    
+    The analysis is conservative - alternatives, groups, escapes and classes just end the current run.
+    """
+
+    if '|' in pattern:
+        return "", []
+
+    runs = []
+    run = []
+    anchored = pattern.startswith('^')
+    prefix = None
+    depth = 0
+    i = 1 if anchored else 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char not in _regex_special:
+            if depth == 0:
+                run.append(char)
+            i += 1
+            continue
+
+        if char in "*?{" and run:
+            del run[-1]
+        if prefix is None:
+            prefix = ''.join(run) if anchored else ""
+        if run:
+            runs.append(''.join(run))
+            run = []
+
+        if char == '\\':
+            i += 2
+        elif char == '[':
+            i = _skip_class(pattern, i)
+        elif char == '{':
+            end = pattern.find('}', i)
+            i = end + 1 if end >= 0 else len(pattern)
+        else:
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            i += 1
+
+    if prefix is None:
+        prefix = ''.join(run) if anchored else ""
+    if run:
+        runs.append(''.join(run))
+    return prefix.lower(), [literal.lower() for literal in runs]
+
+def _glob_literals(pattern):
+    """returns the literal prefix of a glob pattern, and the runs of literal characters between its wildcards"""
+
+    runs = []
+    run = []
+    prefix = None
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char not in _glob_special:
+            run.append(char)
+            i += 1
+            continue
+
+        if prefix is None:
+            prefix = ''.join(run)
+        if run:
+            runs.append(''.join(run))
+            run = []
+        i = _skip_class(pattern, i) if char == '[' else i + 1
+
+    if prefix is None:
+        prefix = ''.join(run)
+    if run:
+        runs.append(''.join(run))
+    return prefix.lower(), [literal.lower() for literal in runs]
+
+def _normalized(prefix, literals):
+    """returns the literal prefix and the required literals in the form of the index keys, which are normalized headwords
+    
+    Normalization maps each character on its own, so the normalized literals are still contained in the normalized headwords.
+    """
+
+    return normalize(prefix), [literal for literal in map(normalize, literals) if literal]
+
+def compile_regex(pattern):
+    """returns a case-insensitive search function for a regular expression, its literal prefix and required literals, or None if the pattern is invalid or unsafe"""
+
+    reason = _unsafe_regex(pattern)
+    if reason is not None:
+        logger.info("rejected regular expression %r: %s", pattern, reason)
+        return None
+    try:
+        regex = re.compile(pattern, re.IGNORECASE)
+    except re.error as ree:
+        logger.debug("invalid regular expression %r: %s", pattern, ree)
+        return None
+    return (regex.search,) + _normalized(*_regex_literals(pattern))
+
+def compile_glob(pattern):
+    """returns a case-insensitive match function for a glob pattern, its literal prefix and required literals"""
+
+    regex = re.compile(fnmatch.translate(pattern), re.IGNORECASE)
+    return (regex.match,) + _normalized(*_glob_literals(pattern))
+
+class Budget:
+    """the time and result budget shared by the pattern searches of a single command"""
+
+    def __init__(self):
+        self.deadline = time.time() + _timeout if _timeout else None
+        self.results = _max_results or None
+        self.stopped = False
+
+    def expired(self):
+        return self.deadline is not None and time.time() > self.deadline
+
+    def exhausted(self):
+        return self.results is not None and self.results <= 0
+
+def search(index, compiled, get_component, budget):
+    """returns the ids of the headwords that match a compiled pattern
+    
+    The pattern is matched against the original headwords, while the index keys only narrow the candidates.
+    Only the headwords that start with the literal prefix are tried, or else those that contain all trigrams of the required literals.
+    Narrowing components are obtained with get_component, which returns None for those that are not enabled.
+    Without a trigram index, or if the literals are too short, the headwords that contain the longest required literal are tried instead.
+    The search stops when it exceeds the time or the result budget, which is consumed by the searches of the whole command.
+    The budget records if it stopped a search, in which case the results are incomplete.
+    """
+
+    if compiled is None:
+        return []
+    if budget.expired() or budget.exhausted():
+        budget.stopped = True
+        return []
+    matcher, prefix, literals = compiled
+
+    positions = None
+    if not prefix and literals:
+        trigrams = get_component("trigrams")
+        if trigrams is not None:
+            positions = trigrams.candidates(literals)
+        if positions is None:
+            for name in ("suffixes", "scanner"):
+                component = get_component(name)
+                if component is not None:
+                    positions = component.positions(max(literals, key=len))
+                    break
+
+    if positions is None:
+        candidates = index.range_ids(*index.prefix_range(prefix))
+    else:
+        candidates = (i for pos in positions for i in index.range_ids(pos, pos + 1))
+
+    headword = index.headword
+    ids = array.array('I')
+    for count, i in enumerate(candidates):
+        if count % _check_interval == 0 and budget.expired():
+            logger.info("pattern search exceeded the time budget")
+            budget.stopped = True
+            break
+        if matcher(headword(i)):
+            ids.append(i)
+            if budget.results is not None:
+                budget.results -= 1
+                if budget.results <= 0:
+                    logger.debug("pattern search reached the result budget")
+                    budget.stopped = True
+                    break
+
+    return ids
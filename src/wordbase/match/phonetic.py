@@ -0,0 +1,184 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import string
+import array
+
+
+_letters = frozenset(string.ascii_lowercase)
+_vowels = frozenset("aeiou")
+
+_soundex_codes = {}
+for letters, code in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6"), ("aeiouy", "0"), ("hw", "")):
+    for letter in letters:
+        _soundex_codes[letter] = code
+del letters, code, letter
+
+
+def _letters_of(word):
+    return ''.join(char for char in word.lower() if char in _letters)
+
+def soundex(word):
+    """returns the american soundex code of a word, or an empty string if it has no latin letters"""
+
+    word = _letters_of(word)
+    if not word:
+        return ""
+
+    code = [word[0].upper()]
+    last = _soundex_codes[word[0]]
+    for letter in word[1:]:
+        digit = _soundex_codes[letter]
+        if digit and digit != last and digit != "0":
+            code.append(digit)
+            if len(code) == 4:
+                break
+        if letter not in "hw":
+            last = digit
+    return ''.join(code).ljust(4, "0")
+
+def metaphone(word):
+    """returns the metaphone code of a word, or an empty string if it has no latin letters
+    
+    The rules are those of the original metaphone algorithm, with "0" standing for "th".
+    """
+
+    word = _letters_of(word)
+    if not word:
+        return ""
+
+    for initial, replacement in (("ae", "e"), ("gn", "n"), ("kn", "n"), ("pn", "n"), ("wr", "r"), ("wh", "w"), ("x", "s")):
+        if word.startswith(initial):
+            word = replacement + word[len(initial):]
+            break
+
+    def at(i):
+        return word[i] if 0 <= i < len(word) else ""
+
+    code = []
+    for i, letter in enumerate(word):
+        prev, next = at(i - 1), at(i + 1)
+        if letter == prev and letter != "c":
+            continue
+
+        if letter in _vowels:
+            if i == 0:
+                code.append(letter)
+        elif letter == "b":
+            if not (prev == "m" and i == len(word) - 1):
+                code.append("b")
+        elif letter == "c":
+            if next == "i" and at(i + 2) == "a" or next == "h":
+                code.append("k" if prev == "s" else "x")
+            elif next in ("i", "e", "y"):
+                if prev != "s":
+                    code.append("s")
+            else:
+                code.append("k")
+        elif letter == "d":
+            if next == "g" and at(i + 2) in ("e", "i", "y"):
+                code.append("j")
+            else:
+                code.append("t")
+        elif letter == "g":
+            if next == "h" and at(i + 2) and at(i + 2) not in _vowels:
+                pass
+            elif next == "n" and (i + 2 == len(word) or word[i + 2:] == "ed"):
+                pass
+            elif prev == "d" and next in ("e", "i", "y"):
+                pass
+            elif next in ("i", "e", "y") and prev != "g":
+                code.append("j")
+            else:
+                code.append("k")
+        elif letter == "h":
+            if prev in _vowels and next not in _vowels:
+                pass
+            elif prev in ("c", "s", "p", "t", "g"):
+                pass
+            else:
+                code.append("h")
+        elif letter == "k":
+            if prev != "c":
+                code.append("k")
+        elif letter == "p":
+            code.append("f" if next == "h" else "p")
+        elif letter == "q":
+            code.append("k")
+        elif letter == "s":
+            if next == "h" or next == "i" and at(i + 2) in ("o", "a"):
+                code.append("x")
+            else:
+                code.append("s")
+        elif letter == "t":
+            if next == "i" and at(i + 2) in ("o", "a"):
+                code.append("x")
+            elif next == "h":
+                code.append("0")
+            elif not (next == "c" and at(i + 2) == "h"):
+                code.append("t")
+        elif letter == "v":
+            code.append("f")
+        elif letter == "w" or letter == "y":
+            if next in _vowels:
+                code.append(letter)
+        elif letter == "x":
+            code.append("ks")
+        elif letter == "z":
+            code.append("s")
+        else:
+            code.append(letter)
+
+    return ''.join(code).upper()
+
+
+class PhoneticIndex:
+    """a map from the phonetic codes of the preprocessed headwords of an index to their ids
+    
+    The codes are computed once, when the index is built, so a query is a single lookup.
+    """
+
+    def __init__(self, encode, index):
+        ids = index.range_ids(0, len(index))
+        codes = {}
+        for pos, key in enumerate(index.keys()):
+            code = encode(key)
+            if code:
+                if code not in codes:
+                    codes[code] = array.array('I')
+                codes[code].append(ids[pos])
+        self._encode = encode
+        self._codes = codes
+
+    def search(self, word):
+        """returns the ids of the headwords with the same code as word"""
+
+        return self._codes.get(self._encode(word), ())
+
+    def memory_size(self):
+        codes = self._codes
+        return sys.getsizeof(codes) + sum(sys.getsizeof(code) + sys.getsizeof(ids) for code, ids in codes.items())
@@ -0,0 +1,59 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import bisect
+import array
+
+from match.index import successor, StringTable
+
+
+class ReversedIndex:
+    """the reversed preprocessed headwords of an index, sorted, for finding the headwords that end with a string
+    
+    A suffix lookup is a prefix lookup of the reversed string, done by bisection like in WordIndex.
+    The reversed headwords are packed into a string table.
+    """
+
+    def __init__(self, index):
+        ids = index.range_ids(0, len(index))
+        reversed_keys = [key[::-1] for key in index.keys()]
+        order = sorted(range(len(reversed_keys)), key=reversed_keys.__getitem__)
+        self._keys = StringTable([reversed_keys[i] for i in order])
+        self._ids = array.array('I', [ids[i] for i in order])
+
+    def search(self, word):
+        """returns the ids of the headwords that end with word"""
+
+        keys = self._keys
+        suffix = word[::-1]
+        lo = bisect.bisect_left(keys, suffix)
+        upper = successor(suffix)
+        hi = bisect.bisect_left(keys, upper, lo) if upper is not None else len(keys)
+        return self._ids[lo:hi]
+
+    def memory_size(self):
+        return self._keys.memory_size() + sys.getsizeof(self._ids)
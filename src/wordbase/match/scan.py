@@ -0,0 +1,118 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import re
+import bisect
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_separator = b'\n'
+
+
+class Scanner:
+    """the preprocessed headwords of an index, packed into a single utf-8 buffer, which is scanned for substrings and suffixes
+    
+    It needs much less memory than a suffix array or a reversed index, at the cost of a scan per query.
+    With NumPy, the scans are vectorized over the whole buffer; otherwise, the buffer is searched with regular expressions.
+    """
+
+    def __init__(self, index):
+        encoded = [key.encode("utf-8", "surrogatepass") for key in index.keys()]
+        starts = array.array('I', [0])
+        total = 0
+        for data in encoded:
+            total += len(data) + 1
+            starts.append(total)
+
+        self._data = _separator.join(encoded) + _separator
+        self._starts = starts
+        self._ids = index.range_ids(0, len(index))
+
+        if numpy is not None:
+            self._bytes = numpy.frombuffer(self._data, dtype=numpy.uint8)
+            self._offsets = numpy.frombuffer(starts, dtype=numpy.uintc)
+
+    def _to_positions(self, offsets):
+        """returns the sorted positions of the headwords, which contain the specified byte offsets"""
+
+        if numpy is not None:
+            positions = numpy.unique(numpy.searchsorted(self._offsets, offsets, side="right") - 1)
+            result = array.array('I')
+            result.frombytes(positions.astype(numpy.uintc).tobytes())
+            return result
+        starts = self._starts
+        return array.array('I', sorted({bisect.bisect_right(starts, offset) - 1 for offset in offsets}))
+
+    def _find(self, literal, at_end):
+        """returns the byte offsets of occurrences of literal, optionally only of those at the ends of headwords"""
+
+        if numpy is not None:
+            data = self._bytes
+            if at_end:
+                offsets = self._offsets[1:].astype(numpy.intp) - 1 - len(literal)
+                offsets = offsets[offsets >= self._offsets[:-1]]
+            else:
+                offsets = numpy.flatnonzero(data[:len(data) - len(literal) + 1] == literal[0])
+            for k, byte in enumerate(literal):
+                offsets = offsets[data[offsets + k] == byte]
+            return offsets
+
+        pattern = re.escape(literal) + (_separator if at_end else b'')
+        return [match.start() for match in re.finditer(pattern, self._data)]
+
+    def positions(self, word):
+        """returns the sorted positions of the headwords that contain word"""
+
+        if not word:
+            return range(len(self._ids))
+        return self._to_positions(self._find(word.encode("utf-8", "surrogatepass"), False))
+
+    def _ids_of(self, positions):
+        ids = self._ids
+        return array.array('I', [ids[pos] for pos in positions])
+
+    def search_substring(self, word):
+        """returns the ids of the headwords that contain word"""
+
+        if not word:
+            return self._ids
+        return self._ids_of(self.positions(word))
+
+    def search_suffix(self, word):
+        """returns the ids of the headwords that end with word"""
+
+        if not word:
+            return self._ids
+        return self._ids_of(self._to_positions(self._find(word.encode("utf-8", "surrogatepass"), True)))
+
+    def memory_size(self):
+        return sys.getsizeof(self._data) + sys.getsizeof(self._starts)
@@ -0,0 +1,110 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import collections
+import bisect
+import array
+
+
+_separator = '\0'
+
+
+class _Prefixes:
+    """a sequence of the leading characters of the suffixes in a suffix array, for bisecting with a string of the same length"""
+
+    def __init__(self, text, suffixes, length):
+        self._text = text
+        self._suffixes = suffixes
+        self._length = length
+
+    def __len__(self):
+        return len(self._suffixes)
+
+    def __getitem__(self, i):
+        pos = self._suffixes[i]
+        return self._text[pos:pos + self._length]
+
+
+class SuffixArray:
+    """a suffix array over the preprocessed headwords of an index, for finding the headwords that contain a string
+    
+    The headwords are concatenated in sorted order, each one followed by a separator, which sorts before any other character.
+    Only suffixes that start inside a headword are indexed, and they are sorted up to the end of their headword, so no match can span two headwords.
+    """
+
+    def __init__(self, index):
+        keys = list(index.keys())
+        text = _separator.join(keys) + _separator
+
+        starts = array.array('I')
+        groups = collections.defaultdict(lambda: array.array('I'))
+        pos = 0
+        for key in keys:
+            starts.append(pos)
+            for offset, char in enumerate(key):
+                groups[char].append(pos + offset)
+            pos += len(key) + 1
+        del keys
+
+        def suffix(pos):
+            return text[pos:text.index(_separator, pos)]
+
+        # sorting materializes the suffixes being compared, so the positions are sorted one group (of a first character) at a time
+        suffixes = array.array('I')
+        for char in sorted(groups):
+            suffixes.extend(sorted(groups.pop(char), key=suffix))
+
+        self._text = text
+        self._starts = starts
+        self._suffixes = suffixes
+        self._ids = index.range_ids(0, len(index))
+
+    def positions(self, word):
+        """returns the sorted positions of the headwords that contain word"""
+
+        if not word:
+            return range(len(self._starts))
+
+        prefixes = _Prefixes(self._text, self._suffixes, len(word))
+        lo = bisect.bisect_left(prefixes, word)
+        hi = bisect.bisect_right(prefixes, word, lo)
+
+        starts = self._starts
+        suffixes = self._suffixes
+        return sorted({bisect.bisect_right(starts, suffixes[i]) - 1 for i in range(lo, hi)})
+
+    def search(self, word):
+        """returns the ids of the headwords that contain word"""
+
+        if not word:
+            return self._ids
+
+        ids = self._ids
+        return array.array('I', [ids[pos] for pos in self.positions(word)])
+
+    def memory_size(self):
+        return sys.getsizeof(self._text) + sys.getsizeof(self._starts) + sys.getsizeof(self._suffixes)
@@ -0,0 +1,85 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import bisect
+import array
+
+from match.index import StringTable
+
+
+class TokenIndex:
+    """an inverted index from the words within the preprocessed headwords of an index to the headword ids
+    
+    The distinct words are packed into a sorted string table, and the postings of all words into a single array of ids, sorted per word.
+    """
+
+    def __init__(self, index):
+        ids = index.range_ids(0, len(index))
+        pairs = []
+        for pos, key in enumerate(index.keys()):
+            headword_id = ids[pos]
+            pairs.extend((token, headword_id) for token in set(key.split()))
+        pairs.sort()
+
+        tokens = []
+        offsets = array.array('I')
+        postings = array.array('I')
+        for token, headword_id in pairs:
+            if not tokens or tokens[-1] != token:
+                tokens.append(token)
+                offsets.append(len(postings))
+            postings.append(headword_id)
+        offsets.append(len(postings))
+
+        self._tokens = StringTable(tokens)
+        self._offsets = offsets
+        self._postings = postings
+
+    def _postings_of(self, token):
+        tokens = self._tokens
+        i = bisect.bisect_left(tokens, token)
+        if i == len(tokens) or tokens[i] != token:
+            return ()
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+    def search(self, word):
+        """returns the ids of the headwords that contain all the words of word as separate words"""
+
+        tokens = word.split()
+        if not tokens:
+            return ()
+
+        postings = sorted((self._postings_of(token) for token in set(tokens)), key=len)
+        if len(postings) == 1:
+            return postings[0]
+        common = set(postings[0])
+        for ids in postings[1:]:
+            common.intersection_update(ids)
+        return common
+
+    def memory_size(self):
+        return self._tokens.memory_size() + sys.getsizeof(self._offsets) + sys.getsizeof(self._postings)
@@ -0,0 +1,207 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import os.path
+import bisect
+import array
+import itertools
+
+from match.index import successor, StringTable, IndexBase
+
+
+class TrieIndex(IndexBase):
+    """a compact index of the headwords of a dictionary
+    
+    The preprocessed headwords form a path-compressed trie, whose nodes are laid out in preorder in flat arrays.
+    The headwords under each node occupy a contiguous range of sorted positions, so lookups produce the same ranges as WordIndex.
+    The original headwords are packed into a string table.
+    """
+
+    def __init__(self, headwords, preprocessed):
+        super().__init__()
+        order = sorted(range(len(preprocessed)), key=preprocessed.__getitem__)
+        keys = [preprocessed[i] for i in order]
+        self._build(keys)
+        self._order = array.array('I', order)
+        self._headwords = StringTable(headwords)
+        self._size = len(keys)
+
+    def _build(self, keys):
+        labels = []
+        label_offsets = array.array('I', [0])
+        total = 0
+        parents = []
+        firsts = array.array('I')
+        counts = array.array('I')
+        terminals = array.array('I')
+
+        stack = [(-1, 0, len(keys), 0, 0)]
+        while stack:
+            parent, lo, hi, start, end = stack.pop()
+            node = len(parents)
+            parents.append(parent)
+
+            prefix = keys[lo][:end] if lo < hi else ""
+            label = prefix[start:]
+            labels.append(label)
+            total += len(label)
+            label_offsets.append(total)
+
+            mid = bisect.bisect_right(keys, prefix, lo, hi)
+            firsts.append(lo)
+            counts.append(hi - lo)
+            terminals.append(mid - lo)
+
+            children = []
+            lo = mid
+            while lo < hi:
+                upper = successor(prefix + keys[lo][end])
+                mid = bisect.bisect_left(keys, upper, lo, hi) if upper is not None else hi
+                common = len(os.path.commonprefix((keys[lo], keys[mid - 1])))
+                children.append((node, lo, mid, end, common))
+                lo = mid
+            stack.extend(reversed(children))
+
+        sizes = array.array('I', [1]) * len(parents)
+        for node in range(len(parents) - 1, 0, -1):
+            sizes[parents[node]] += sizes[node]
+
+        self._labels = ''.join(labels)
+        self._label_offsets = label_offsets
+        self._sizes = sizes
+        self._firsts = firsts
+        self._counts = counts
+        self._terminals = terminals
+
+    def _find(self, prefix):
+        """returns the node, whose subtree holds exactly the keys starting with prefix, and whether prefix ends at that node"""
+
+        labels = self._labels
+        offsets = self._label_offsets
+        sizes = self._sizes
+
+        node = 0
+        pos = 0
+        length = len(prefix)
+        while pos < length:
+            char = prefix[pos]
+            child = node + 1
+            end = node + sizes[node]
+            while child < end and labels[offsets[child]] < char:
+                child += sizes[child]
+            if child >= end or labels[offsets[child]] != char:
+                return None, False
+
+            start = offsets[child]
+            label_length = offsets[child + 1] - start
+            n = min(label_length, length - pos)
+            if labels[start:start + n] != prefix[pos:pos + n]:
+                return None, False
+            pos += n
+            node = child
+            if n < label_length:
+                return node, False
+
+        return node, True
+
+    def __len__(self):
+        return self._size
+
+    def exact_range(self, key):
+        """returns the range of sorted positions of the headwords equal to key"""
+
+        node, complete = self._find(key)
+        if node is None or not complete:
+            return 0, 0
+        lo = self._firsts[node]
+        return lo, lo + self._terminals[node]
+
+    def prefix_range(self, prefix):
+        """returns the range of sorted positions of the headwords starting with prefix"""
+
+        node = self._find(prefix)[0]
+        if node is None:
+            return 0, 0
+        lo = self._firsts[node]
+        return lo, lo + self._counts[node]
+
+    def key(self, pos):
+        """returns the preprocessed headword at a sorted position, by descending to the node where it ends"""
+
+        labels = self._labels
+        offsets = self._label_offsets
+        sizes = self._sizes
+        firsts = self._firsts
+        counts = self._counts
+
+        parts = []
+        node = 0
+        while pos >= firsts[node] + self._terminals[node]:
+            child = node + 1
+            while firsts[child] + counts[child] <= pos:
+                child += sizes[child]
+            node = child
+            parts.append(labels[offsets[node]:offsets[node + 1]])
+        return ''.join(parts)
+
+    def keys(self):
+        labels = self._labels
+        offsets = self._label_offsets
+        sizes = self._sizes
+        terminals = self._terminals
+
+        path = []
+        for node in range(len(sizes)):
+            while path and path[-1][0] <= node:
+                del path[-1]
+            prefix = path[-1][1] if path else ""
+            prefix += labels[offsets[node]:offsets[node + 1]]
+            for i in range(terminals[node]):
+                yield prefix
+            path.append((node + sizes[node], prefix))
+
+    def range_keys(self, lo, hi):
+        # a full traversal is cheaper than descending from the root for every headword of a large range
+        if hi - lo > len(self) // 16:
+            return itertools.islice(self.keys(), lo, hi)
+        return map(self.key, range(lo, hi))
+
+    def range_ids(self, lo, hi):
+        return self._order[lo:hi]
+
+    def headword(self, headword_id):
+        return self._headwords[headword_id]
+
+    def get_headwords(self, ids):
+        """returns the headwords with the specified ids, in their original order"""
+
+        headwords = self._headwords
+        return [headwords[i] for i in sorted(ids)]
+
+    def _memory_size(self):
+        arrays = (self._label_offsets, self._sizes, self._firsts, self._counts, self._terminals, self._order)
+        return sys.getsizeof(self._labels) + sum(map(sys.getsizeof, arrays)) + self._headwords.memory_size()
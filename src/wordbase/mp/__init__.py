@@ -24,6 +24,9 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+class OverloadError(Exception):
+    pass
+
 class DummyLock:
     def _dummy(self, *args):
         pass
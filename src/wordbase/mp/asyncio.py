@@ -0,0 +1,170 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import logging
+
+import debug
+import modules
+import net
+import db
+import cache
+import core
+
+
+_RECV_SIZE = 4096
+
+_max_clients = 0
+_workers = 0
+
+_executor = None
+_num_sessions = 0
+_local = threading.local()
+
+logger = None
+
+is_threaded = True
+is_subproc = False
+
+Lock = threading.Lock
+
+
+def configure(config):
+    global _max_clients, _workers
+    _max_clients = config.getint("max-clients", 10000)
+    _workers = config.getint("workers", 20)
+    if _workers <= 0:
+        raise ValueError("invalid number of asyncio workers")
+    global logger
+    logger = logging.getLogger(__name__)
+    logger.debug("initialized")
+
+def _get_resources():
+    resources = getattr(_local, "resources", None)
+    if resources is None:
+        backend = modules.db().Backend()
+        cacher = modules.cache().Cache()
+        backend.connect()
+        cacher.connect()
+        resources = _local.resources = (backend, cacher)
+    return resources
+
+def _release_resources():
+    resources = getattr(_local, "resources", None)
+    if resources is None:
+        return
+    _local.resources = None
+    core.close_resources(*resources)
+
+def _execute(conn, lines):
+    try:
+        backend, cacher = _get_resources()
+        return core.execute_batch(conn, backend, cacher, lines)
+    except (db.BackendError, cache.CacheError):
+        _release_resources()
+        core.send_unavailable(conn)
+        return True
+
+async def _read_lines(reader, conn, timeout):
+    lines = conn.buffered_lines()
+    while not lines:
+        data = await asyncio.wait_for(reader.read(_RECV_SIZE), timeout)
+        if not data:
+            raise EOFError("connection closed by client")
+        conn.feed(data)
+        lines = conn.buffered_lines()
+    return lines
+
+async def _send_output(writer, conn, timeout):
+    data = conn.get_output()
+    if data:
+        writer.write(data)
+        await asyncio.wait_for(writer.drain(), timeout)
+
+async def _session(reader, writer, timeout):
+    loop = asyncio.get_event_loop()
+    conn = net.BufferedConnection()
+
+    core.start_session(conn)
+    await _send_output(writer, conn, timeout)
+
+    end = False
+    while not end:
+        lines = await _read_lines(reader, conn, timeout)
+        end = await loop.run_in_executor(_executor, _execute, conn, lines)
+        await _send_output(writer, conn, timeout)
+
+async def _process_client(timeout, reader, writer):
+    global _num_sessions
+    host, port = writer.get_extra_info("peername")[:2]
+    logger.debug("accepted connection from address %s:%d", host, port)
+
+    try:
+        if _max_clients and _num_sessions >= _max_clients:
+            logger.warning("max-clients limit exceeded; rejecting connection")
+            conn = net.BufferedConnection()
+            core.send_unavailable(conn)
+            await _send_output(writer, conn, timeout)
+            return
+
+        _num_sessions += 1
+        logger.info("session started from address %s:%d", host, port)
+        try:
+            await _session(reader, writer, timeout)
+        finally:
+            _num_sessions -= 1
+            logger.info("session ended")
+    except (IOError, EOFError, UnicodeDecodeError, BufferError, asyncio.TimeoutError) as ex:
+        exc_info = sys.exc_info() if debug.enabled else None
+        logger.error(ex, exc_info=exc_info)
+    except Exception:
+        logger.exception("unexpected error")
+    finally:
+        logger.debug("closing client connection")
+        writer.close()
+
+async def _serve(socks, timeout):
+    client_handler = functools.partial(_process_client, timeout)
+    servers = [await asyncio.start_server(client_handler, sock=sock) for sock in socks]
+    logger.info("waiting for connections")
+    await asyncio.gather(*[server.serve_forever() for server in servers])
+
+def serve(socks, timeout):
+    """runs the event loop, accepting connections on the listening sockets socks
+    
+    Sessions run as coroutines, and their commands are executed by a pool of worker threads.
+    """
+
+    global _executor
+    _executor = concurrent.futures.ThreadPoolExecutor(_workers)
+    try:
+        asyncio.run(_serve(socks, timeout))
+    finally:
+        _executor.shutdown(wait=False)
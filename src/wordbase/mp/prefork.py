@@ -0,0 +1,144 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import os
+import socket
+import signal
+import errno
+import random
+import time
+import logging
+
+import mp
+import modules
+import core
+
+
+_MIN_UPTIME = 1
+
+_workers = 0
+_reuse_port = False
+
+_children = {}
+
+logger = None
+
+is_threaded = False
+is_subproc = True
+
+Lock = mp.DummyLock
+
+
+def configure(config):
+    global _workers, _reuse_port
+    _workers = config.getint("workers", 20)
+    if _workers <= 0:
+        raise ValueError("invalid number of prefork workers")
+    _reuse_port = config.getboolean("reuse-port", False)
+    if _reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError("reuse-port is not supported on this platform")
+
+    global logger
+    logger = logging.getLogger(__name__)
+
+    logger.debug("initialized")
+
+def num_listeners():
+    return _workers if _reuse_port else 1
+
+def _accept_connections(sock, timeout, backend, cacher):
+    while True:
+        try:
+            conn, addr = sock.accept()
+        except IOError as ioe:
+            if ioe.errno == errno.EINTR: continue
+            else: raise
+
+        host, port = addr
+        logger.debug("accepted connection from address %s:%d", host, port)
+
+        conn.settimeout(timeout)
+
+        core.process_session(conn, addr, backend, cacher)
+
+def _worker(sock, timeout):
+    random.seed()
+    with modules.db().Backend() as backend, modules.cache().Cache() as cacher:
+        _accept_connections(sock, timeout, backend, cacher)
+
+def _spawn(index, sock, timeout):
+    pid = os.fork()
+    if pid == 0:
+        logger.debug("worker process started")
+        status = 0
+        try:
+            _worker(sock, timeout)
+        except Exception:
+            logger.exception("unhandled exception")
+            status = 1
+        finally:
+            logger.debug("worker process exiting")
+        sys.exit(status)
+    else:
+        _children[pid] = (index, time.time())
+
+def _terminate_children():
+    for pid in _children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+def serve(socks, timeout):
+    """runs a pool of worker processes, which accept connections on the listening sockets socks
+    
+    Each worker serves one session at a time, and keeps its database and cache connections between sessions.
+    Workers that terminate are respawned.
+    """
+
+    pid = os.getpid()
+    try:
+        for index in range(_workers):
+            _spawn(index, socks[index % len(socks)], timeout)
+
+        logger.info("waiting for connections")
+
+        while True:
+            try:
+                child, status = os.wait()
+            except IOError as ioe:
+                if ioe.errno == errno.EINTR: continue
+                else: raise
+
+            index, start_time = _children.pop(child)
+            logger.warning("worker process %d terminated with status %d; respawning", child, status)
+            if time.time() - start_time < _MIN_UPTIME:
+                time.sleep(_MIN_UPTIME)
+            _spawn(index, socks[index % len(socks)], timeout)
+    finally:
+        if os.getpid() == pid:
+            _terminate_children()
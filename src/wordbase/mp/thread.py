@@ -25,11 +25,26 @@
 
 
 import threading
+import queue
+import time
 import logging
 
+import mp
+import util.stats
+
+
+_overflow_policies = ("reject", "queue", "block")
 
 _max_threads = 0
-_guard_sem = None
+_queue_size = 0
+_overflow = ""
+
+_queue = None
+_workers = []
+_pending = 0
+_pending_cond = threading.Condition()
+
+_counters = util.stats.Counters("max-queued", "rejected", "waited", "wait-time", "max-wait")
 
 logger = None
 
@@ -39,31 +54,86 @@ is_subproc = False
 Lock = threading.Lock
 
 
+def _stats():
+    waited = _counters.get("waited")
+    avg_wait = _counters.get("wait-time") / waited if waited else 0.0
+    return [
+            ("queued", _queue.qsize()),
+            ("max-queued", _counters.get("max-queued")),
+            ("rejected", _counters.get("rejected")),
+            ("avg-wait", avg_wait),
+            ("max-wait", float(_counters.get("max-wait"))),
+           ]
+
 def configure(config):
-    global _max_threads, _guard_sem
+    global _max_threads, _queue_size, _overflow, _queue
     _max_threads = config.getint("max-clients", 20)
+    _queue_size = config.getint("queue-size", 0)
+    _overflow = config.get("overflow", "block")
+    if _overflow not in _overflow_policies:
+        raise ValueError("invalid overflow policy: {}".format(_overflow))
+    _queue = queue.Queue()
+
     if _max_threads:
-        _guard_sem = threading.Semaphore(_max_threads)
+        util.stats.register("threads", _stats)
+
     global logger
     logger = logging.getLogger(__name__)
     logger.debug("initialized")
 
 def thread_task(task, sock, *args):
-    logger.debug("thread started")
     try:
         task(sock, *args)
     except Exception:
         logger.exception("unhandled exception")
-    finally:
-        logger.debug("thread exiting")
-        if _max_threads:
-            _guard_sem.release()
+
+def _worker_task():
+    global _pending
+    logger.debug("worker thread started")
+    while True:
+        enqueue_time, task, sock, args = _queue.get()
+
+        wait_time = time.time() - enqueue_time
+        _counters.add("waited")
+        _counters.add("wait-time", wait_time)
+        _counters.set_max("max-wait", wait_time)
+
+        try:
+            thread_task(task, sock, *args)
+        finally:
+            with _pending_cond:
+                _pending -= 1
+                _pending_cond.notify()
+
+def _start_workers():
+    for i in range(_max_threads - len(_workers)):
+        thr = threading.Thread(target=_worker_task)
+        thr.daemon = True
+        thr.start()
+        _workers.append(thr)
+
+def _reserve():
+    global _pending
+    limit = _max_threads if _overflow == "reject" else _max_threads + _queue_size
+    with _pending_cond:
+        if _pending >= limit:
+            if _overflow != "block":
+                _counters.add("rejected")
+                logger.warning("max-clients limit exceeded; rejecting connection")
+                raise mp.OverloadError("server overloaded")
+            logger.warning("max-clients limit exceeded; waiting for a thread to become available")
+            while _pending >= limit:
+                _pending_cond.wait()
+        _pending += 1
 
 def process(task, sock, *args):
-    if _max_threads:
-        if not _guard_sem.acquire(False):
-            logger.warning("max-clients limit exceeded; waiting for a thread to terminate")
-            _guard_sem.acquire()
-    thr = threading.Thread(target=thread_task, args = (task, sock) + args)
-    thr.daemon = True
-    thr.start()
+    if not _max_threads:
+        thr = threading.Thread(target=thread_task, args = (task, sock) + args)
+        thr.daemon = True
+        thr.start()
+        return
+
+    _start_workers()
+    _reserve()
+    _queue.put((time.time(), task, sock, args))
+    _counters.set_max("max-queued", _queue.qsize())
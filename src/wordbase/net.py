@@ -25,7 +25,6 @@
 
 
 import sys
-import io
 import logging
 
 import debug
@@ -33,6 +32,12 @@ import log
 
 
 DICT_EOL = '\r\n'
+MAX_LINE_LENGTH = 1024
+
+_EOL_BYTES = DICT_EOL.encode("utf-8")
+_RECV_SIZE = 4096
+_FLUSH_SIZE = 65536
+_MAX_IOV = 1024
 
 logger = None
 
@@ -57,7 +62,50 @@ def net_exc(func):
 
 class Connection:
     def __init__(self, sock):
-        self._sio = sock.makefile(mode="rw", encoding="utf-8", newline='')
+        self._sock = sock
+        self._rbuf = bytearray()
+        self._wbuf = []
+        self._wsize = 0
+
+    @staticmethod
+    def _check_length(length):
+        if length + len(DICT_EOL) > MAX_LINE_LENGTH:
+            raise BufferError("maximum command line length exceeded by client")
+
+    def _receive(self):
+        data = self._sock.recv(_RECV_SIZE)
+        if not data:
+            raise EOFError("connection closed by client")
+        self._rbuf.extend(data)
+
+    def _next_line(self):
+        buff = self._rbuf
+        end = buff.find(_EOL_BYTES)
+        if end < 0:
+            pending = buff[:-1] if buff.endswith(b"\r") else buff
+            if len(pending) + len(DICT_EOL) > MAX_LINE_LENGTH:
+                self.__class__._check_length(len(pending.decode("utf-8", "ignore")))
+            return None
+        line = buff[:end].decode("utf-8")
+        del buff[:end + len(_EOL_BYTES)]
+        self.__class__._check_length(len(line))
+        log.trace_client(line)
+        return line
+
+    def _buffered_lines(self):
+        lines = []
+        line = self._next_line()
+        while line is not None:
+            lines.append(line)
+            line = self._next_line()
+        return lines
+
+    def _read_line(self):
+        line = self._next_line()
+        while line is None:
+            self._receive()
+            line = self._next_line()
+        return line
 
     @net_exc
     def read_line(self):
@@ -68,24 +116,20 @@ class Connection:
         throws socket.timeout, EOFError, BufferError
         """
 
-        buff = io.StringIO(newline='\n')
-        count = 0
-        have_cr = False
-
-        while count < 1024:
-            ch = self._sio.read(1)
-            if not ch:
-                raise EOFError("connection closed by client")
-            buff.write(ch)
-            count += 1
-
-            if ch == '\n' and have_cr:
-                line = buff.getvalue()[:-2]
-                log.trace_client(line)
-                return line
-            have_cr = ch == '\r'
-        else:
-            raise BufferError("maximum command line length exceeded by client")
+        return self._read_line()
+
+    @net_exc
+    def read_lines(self):
+        """reads a line of input, followed by any further complete lines that are already buffered
+        
+        The trailing EOLs are stripped.
+        
+        throws socket.timeout, EOFError, BufferError
+        """
+
+        lines = [self._read_line()]
+        lines.extend(self._buffered_lines())
+        return lines
 
     @staticmethod
     def _split_line(line):
@@ -104,11 +148,39 @@ class Connection:
     def _trunc_line(cls, line):
         return next(cls._split_line(line))
 
+    def _send(self, chunks):
+        sock = self._sock
+        if not hasattr(sock, "sendmsg"):
+            sock.sendall(b''.join(chunks))
+            return
+
+        i = 0
+        while i < len(chunks):
+            sent = sock.sendmsg(chunks[i:i+_MAX_IOV])
+            while i < len(chunks) and sent >= len(chunks[i]):
+                sent -= len(chunks[i])
+                i += 1
+            if sent:
+                chunks[i] = memoryview(chunks[i])[sent:]
+
+    def _take_output(self):
+        chunks = self._wbuf
+        self._wbuf = []
+        self._wsize = 0
+        return chunks
+
+    def _flush(self):
+        chunks = self._take_output()
+        if chunks:
+            self._send(chunks)
+
     def _write(self, line):
-        data = ''.join((line, DICT_EOL))
-        self._sio.write(data)
-        self._sio.flush()
+        data = ''.join((line, DICT_EOL)).encode("utf-8")
+        self._wbuf.append(data)
+        self._wsize += len(data)
         log.trace_server(line)
+        if self._wsize >= _FLUSH_SIZE:
+            self._flush()
 
     @net_exc
     def write_line(self, line, split=True):
@@ -141,12 +213,58 @@ class Connection:
             self.write_line(line)
         self.write_text_end()
 
+    @net_exc
+    def flush(self):
+        """sends the buffered output
+        
+        Output is also sent when the buffer grows above a threshold, and when the connection is closed.
+        """
+
+        self._flush()
+
     @net_exc
     def close(self):
-        self._sio.close()
+        self._flush()
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
         self.close()
+
+class BufferedConnection(Connection):
+    """a connection, which is fed input and accumulates output in memory
+    
+    Used by engines that perform the socket IO themselves.
+    """
+
+    def __init__(self):
+        self._rbuf = bytearray()
+        self._wbuf = []
+        self._wsize = 0
+
+    def read_line(self):
+        debug.not_impl(self)
+
+    def feed(self, data):
+        """appends received data to the input buffer"""
+
+        self._rbuf.extend(data)
+
+    def buffered_lines(self):
+        """returns the complete lines of input in the buffer
+        
+        The trailing EOLs are stripped.
+        
+        throws BufferError, UnicodeDecodeError
+        """
+
+        return self._buffered_lines()
+
+    def _flush(self):
+        pass
+
+    def get_output(self):
+        """returns and clears the accumulated output"""
+
+        return b''.join(self._take_output())
@@ -0,0 +1,81 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import threading
+import collections
+
+
+_sources = collections.OrderedDict()
+
+
+def register(name, source):
+    """registers a source of statistics
+    
+    The source is a function, which returns a sequence of (key, value) pairs.
+    """
+
+    _sources[name] = source
+
+def _format_value(value):
+    if isinstance(value, float):
+        return "{:.3f}".format(value)
+    return str(value)
+
+def report():
+    """returns the statistics of all registered sources, formatted as a single line"""
+
+    parts = []
+    for name, source in _sources.items():
+        items = ", ".join("{}={}".format(key, _format_value(value)) for key, value in source())
+        parts.append("{}: {}".format(name, items))
+    return "; ".join(parts)
+
+
+class Counters:
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._values = collections.OrderedDict((name, 0) for name in names)
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._values[name] += value
+
+    def set(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def set_max(self, name, value):
+        with self._lock:
+            if value > self._values[name]:
+                self._values[name] = value
+
+    def get(self, name):
+        with self._lock:
+            return self._values[name]
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
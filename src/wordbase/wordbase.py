@@ -40,6 +40,7 @@ import log
 import util.srvmon
 import modules
 import match
+import wordindex
 import core
 import master
 
@@ -57,7 +58,7 @@ version_info = \
 Copyright (C) 2011 Victor Semionov"""
 
 usage_help = \
-"""Usage: {name} [-f conf_file] [-d command] [-D]
+"""Usage: {name} [-f conf_file] [-d command] [-D] [-i]
 
 Options:
  -v            print version information and exit
@@ -65,6 +66,7 @@ Options:
  -f conf_file  read the specified configuration file
  -d            daemon mode
  -D            debug mode
+ -i            write the index files of all dictionaries and exit
 
 Daemon control commands:
  start         start daemon
@@ -122,10 +124,16 @@ def start_server(wbconfig, mp):
     timeout = wbconfig.getint("timeout", 60) or None
     address = (host, port)
 
-    master.init(address, backlog)
+    master.init(address, backlog, mp)
     drop_privs(wbconfig)
     master.run(timeout, mp)
 
+def get_index_config(config):
+    # the section was added in a later version, and all of its settings have defaults
+    if not config.has_section("index"):
+        config.add_section("index")
+    return config["index"]
+
 def server_control(config, daemon_cmd):
     start_cmd = "start"
     stop_cmd = "stop"
@@ -149,6 +157,9 @@ def server_control(config, daemon_cmd):
         match.configure(dconfig)
         core.configure(dconfig)
 
+        iconfig = get_index_config(config)
+        wordindex.configure(iconfig)
+
         wbdaemon.run_args = (wbconfig, modules.mp())
 
         if daemon_cmd == start_cmd:
@@ -174,12 +185,22 @@ def server_control(config, daemon_cmd):
 
     control_func()
 
+def write_indexes(config):
+    modules.init(config)
+
+    iconfig = get_index_config(config)
+    wordindex.configure(iconfig)
+
+    with modules.db().Backend() as backend:
+        wordindex.write_files(backend)
+
 def main():
     conf_path = None
     daemon = None
+    index = False
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "vhf:d:D")
+        opts, args = getopt.getopt(sys.argv[1:], "vhf:d:Di")
     except getopt.GetoptError as ge:
         print(ge, file=sys.stderr)
         print_help_hint()
@@ -203,6 +224,8 @@ def main():
             daemon = arg
         elif opt == "-D":
             debug.enabled = True
+        elif opt == "-i":
+            index = True
         else:
             assert False, "unhandled option"
 
@@ -218,7 +241,10 @@ def main():
         config = configparser.ConfigParser(delimiters="=", inline_comment_prefixes="#")
         config.read_file(conf, conf_path)
 
-    server_control(config, daemon)
+    if index:
+        write_indexes(config)
+    else:
+        server_control(config, daemon)
 
 
 try:
@@ -0,0 +1,218 @@
+# Copyright (C) 2011 Victor Semionov
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#  * Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#  * Neither the name of the copyright holder nor the names of the contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import time
+import logging
+
+import modules
+import match
+import util.stats
+
+
+logger = None
+
+_check_interval = 0
+_index_class = None
+_index_path = None
+
+_lock = None
+_entries = {}
+
+_counters = util.stats.Counters("builds", "invalidations")
+
+
+class _Entry:
+    def __init__(self, index, stamp):
+        self.index = index
+        self.stamp = stamp
+        self.checked = time.time()
+
+
+_index_types = {
+                "sorted": match.WordIndex,
+                "trie": match.TrieIndex,
+               }
+
+
+def _stats():
+    return [("dictionaries", len(_entries))] + _counters.items()
+
+def _memory_stats():
+    return sorted((db_name, entry.index.memory_size()) for db_name, entry in list(_entries.items()))
+
+def configure(config):
+    global _check_interval
+    _check_interval = config.getint("check-interval", 10)
+
+    global _index_class
+    index_type = config.get("type", "trie")
+    if index_type not in _index_types:
+        raise ValueError("invalid index type: {}".format(index_type))
+    _index_class = _index_types[index_type]
+
+    global _index_path
+    _index_path = config.get("path", "") or None
+
+    match.configure_index(config)
+
+    global _lock
+    _lock = modules.mp().Lock()
+
+    util.stats.register("indexes", _stats)
+    util.stats.register("index memory", _memory_stats)
+
+    global logger
+    logger = logging.getLogger(__name__)
+
+def _retrieve_words(backend, cacher, db_name, stamp):
+    def parse_list(data):
+        items = data.splitlines()
+        return items
+
+    def format_list(items):
+        mangle = len(items) > 0 and len(items[-1]) == 0
+        if mangle:
+            items.append("")
+        formatted = '\n'.join(items)
+        if mangle:
+            del items[-1]
+        return formatted
+
+    words_name = "words:{}:{}".format(db_name, stamp)
+    preproc_name = "preproc{}:{}:{}".format(match.PREPROCESS_VERSION, db_name, stamp)
+
+    words_cache = cacher.get(words_name)
+    if words_cache is not None:
+        words = parse_list(words_cache)
+    else:
+        words = backend.get_words(db_name)
+        formatted = format_list(words)
+        cacher.set(words_name, formatted)
+
+    preproc_cache = cacher.get(preproc_name)
+    if preproc_cache is not None:
+        preprocessed = parse_list(preproc_cache)
+    else:
+        preprocessed = match.preprocessed(words)
+        formatted = format_list(preprocessed)
+        cacher.set(preproc_name, formatted)
+
+    return words, preprocessed
+
+def _get_stamp(backend, db_name):
+    return str(backend.get_dictionary_id(db_name))
+
+def _file_path(db_name):
+    return os.path.join(_index_path, db_name + ".idx")
+
+def _load_file(db_name, stamp):
+    """maps the index file of a dictionary, if it exists and is up to date; if stamp is None, the file is assumed up to date"""
+
+    path = _file_path(db_name)
+    if not os.path.exists(path):
+        logger.warning("dictionary %s has no index file; building its word index in memory", db_name)
+        return None
+
+    try:
+        index = match.MappedIndex(path)
+    except (IOError, ValueError) as ex:
+        logger.error("failed to map index file %s: %s", path, ex)
+        return None
+
+    if stamp is not None and index.stamp != stamp:
+        logger.warning("index file %s is out of date; building the word index of dictionary %s in memory", path, db_name)
+        return None
+
+    return index
+
+def write_files(backend):
+    """writes the index files of all real dictionaries"""
+
+    if _index_path is None:
+        raise ValueError("index file path not configured")
+
+    for name, virtual, short_desc in backend.get_databases():
+        del short_desc
+        if virtual:
+            continue
+        stamp = _get_stamp(backend, name)
+        words = backend.get_words(name)
+        preprocessed = match.preprocessed(words)
+        match.write_index(_file_path(name), words, preprocessed, stamp)
+        logger.info("wrote index file of dictionary %s (%d headwords)", name, len(words))
+
+def _is_current(entry, backend, db_name):
+    now = time.time()
+    if now - entry.checked < _check_interval:
+        return True
+    if _get_stamp(backend, db_name) != entry.stamp:
+        return False
+    entry.checked = now
+    return True
+
+def get_index(backend, cacher, db_name):
+    """returns the word index of a real dictionary
+    
+    Indexes are built on first use, and are shared by all sessions in the process.
+    If an index file path is configured, index files are mapped instead; a freshly mapped file is trusted to be up to date until the next check.
+    An index is rebuilt if its dictionary has been changed since, which is checked at most once per check interval.
+    """
+
+    entry = _entries.get(db_name)
+    if entry is not None and _is_current(entry, backend, db_name):
+        return entry.index
+
+    with _lock:
+        current = _entries.get(db_name)
+        if current is not None and current is not entry:
+            return current.index
+
+        if entry is not None:
+            stamp = _get_stamp(backend, db_name)
+            _counters.add("invalidations")
+            logger.info("dictionary %s changed; rebuilding its word index", db_name)
+        else:
+            stamp = None
+
+        index = None
+        if _index_path is not None:
+            index = _load_file(db_name, stamp)
+            if index is not None:
+                stamp = index.stamp
+
+        if index is None:
+            if stamp is None:
+                stamp = _get_stamp(backend, db_name)
+            words, preprocessed = _retrieve_words(backend, cacher, db_name, stamp)
+            index = _index_class(words, preprocessed)
+        size = index.memory_size()
+        entry = _Entry(index, stamp)
+        _entries[db_name] = entry
+        _counters.add("builds")
+        logger.debug("built word index of dictionary %s (%d headwords, %d bytes)", db_name, len(index), size)
+
+        return index